@@ -1,10 +1,4 @@
-## SET BACKEND A magical trick from """https://stackoverflow.com/questions/47356726/fix-matplotlib-not-installed-as-framework-error-w-out-changing-matplotlib-con"""
-import matplotlib as mpl
-mpl.use('TkAgg')
-
 import numpy as np
-import matplotlib.pyplot as plt
-import scipy as sp
 import math
 import sys
 
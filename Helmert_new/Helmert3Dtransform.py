@@ -7,7 +7,11 @@ Created on Tue Jun  1 16:23:20 2021
 
 import numpy as np
 import math
-from angle import Angle as a
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .angle import Angle as a
+from .pointset import PointSet, as_pointset, Identical_points
 
 def X_Rotation(alpha):
     Rxc = math.cos(alpha)
@@ -51,130 +55,738 @@ def Rotation_matrix(angle_tuple):
                                                 @ Z_Rotation(angle_tuple[2])
     return R
 
-def Transformation(x, From):
-    """3D Helmert transformation with known transformation Key
-    From is a dictionary of points
-    (Rotation matrix parameters, Translation vector and scale in tuple)"""
-    T = np.array(x[0:3])
-    q = float(x[3])
-    R = Rotation_matrix(x[-3:])
-    From_transformed = {}
-    for point in From:
-        From_transformed[point] = tuple(T + q * R @ np.array(From[point][:3]))
-    return From_transformed
-
-def Helmert_aproximate_parameters(From,To):
-    identicals = list(set(To.keys()) & set(From.keys()))
-    if len(identicals) >= 3:
-        #MAKE BETTER CHOICE ON POINTS WHEN YOU HAVE TIME, IF YOU WANT... PLEASE
-        point1_To = np.array(To[identicals[0]][:3])
-        point2_To = np.array(To[identicals[-1]][:3])
-        point3_To = np.array(To[identicals[len(identicals)//2]][:3])
-        point1_To_original = point1_To.copy().transpose()
-        #// truncating division = rounds result to lower int
-        point1_From = np.array(From[identicals[0]][:3])
-        point2_From = np.array(From[identicals[-1]][:3])
-        point3_From = np.array(From[identicals[len(identicals)//2]][:3])
-        point1_From_original = point1_From.copy().transpose()
-        # Translation of the points to have origin in point 1:
-        point2_To = point2_To - point1_To
-        point3_To = point3_To - point1_To
-        point1_To = np.array([0,0,0])              # is an int Array
-        point2_From = point2_From - point1_From
-        point3_From = point3_From - point1_From
-        point1_From = np.array([0,0,0])
-        # Calculating the aproximate parameters
-        # (based on Angle between planes paper)
-        # First rotation angle calculations
-        psi_To   = math.atan2(point2_To[1],  point2_To[0])
-        psi_From = math.atan2(point2_From[1],point2_From[0])
-#        print(psi_To, psi_From)
-        # Applying the calculated angle to point 2 and 3
-        FirstZrotation2_To   = Z_Rotation(psi_To)   @ point2_To.transpose()
-        FirstZrotation3_To   = Z_Rotation(psi_To)   @ point3_To.transpose()
-        FirstZrotation2_From = Z_Rotation(psi_From) @ point2_From.transpose()
-        FirstZrotation3_From = Z_Rotation(psi_From) @ point3_From.transpose()
-#        print(FirstZrotation2_To,FirstZrotation3_To)
-#        print(FirstZrotation2_From, FirstZrotation3_From)
-        # Calculating second rotation angle from the first rotated coordinates
-#        fi_To = math.atan2(-FirstZrotation2_To[0],FirstZrotation2_To[2])
-#        fi_From = math.atan2(-FirstZrotation2_From[0],FirstZrotation2_From[2])
-        fi_To   = math.atan2(FirstZrotation2_To[2]  ,FirstZrotation2_To[0])     # Markus
-        fi_From = math.atan2(FirstZrotation2_From[2],FirstZrotation2_From[0])   # Markus
-#        print(fi_To, fi_From)
-        # Applying the calculated angle to point 3
-        SecondYrotation3_To =   Y_Rotation(fi_To)   @ FirstZrotation3_To.transpose()
-        SecondYrotation3_From = Y_Rotation(fi_From) @ FirstZrotation3_From.transpose()
-        # Calculating third rotation angle
-#        theta_To = math.atan2(SecondYrotation3_To[1],SecondYrotation3_To[0])
-#        theta_From = math.atan2(SecondYrotation3_From[1], SecondYrotation3_From[0])
-        theta_To =   math.atan2(SecondYrotation3_To[2],   SecondYrotation3_To[1])     # Markus
-        theta_From = math.atan2(SecondYrotation3_From[2], SecondYrotation3_From[1])   # Markus
-#        print(theta_To, theta_From)
-        # Using all three angles, the full rotation matrix for From To is made
-#        R_To = Z_Rotation(theta_To) @ Y_Rotation(fi_To) @ Z_Rotation(psi_To)
-#        R_From = Z_Rotation(theta_From) @ Y_Rotation(fi_From) @ Z_Rotation(
-#                                                                      psi_From)
-        R_To =   X_Rotation(theta_To)   @ Y_Rotation(fi_To)   @ Z_Rotation(psi_To)     # Markus
-        R_From = X_Rotation(theta_From) @ Y_Rotation(fi_From) @ Z_Rotation(psi_From)   # Markus
-        # The translation vector is calculated by rotating the original
-        # point1_From to the "To" coordinate frame. By substracting the rotated
-        # point1_From from point1_To we get the translation vector.
-        R0 = R_To.transpose() @ R_From
-        Translation = tuple(point1_To_original - R0 @ point1_From_original)
-#        Translation = tuple(point1_To_original - point1_From_original)   # Markus
-        # Euler rotation angles - rotating points, not CS
-        alpha = math.atan2(R0[1,2],R0[2,2])
-        beta  = math.asin(R0[0,2])
-        gamma = math.atan2(R0[0,1],R0[0,0])
-        R_angles = (alpha, beta, gamma)
-        x0 = Translation + (1.0,) + R_angles
+def Rotation_angles(R):
+    """Euler angles (alpha, beta, gamma) of a rotation matrix composed as in
+    Rotation_matrix - rotating points, not CS. Works on stacks (...,3,3)"""
+    R = np.asarray(R)
+    alpha = np.arctan2(R[..., 1, 2], R[..., 2, 2])
+    beta  = np.arcsin(np.clip(R[..., 0, 2], -1.0, 1.0))
+    gamma = np.arctan2(R[..., 0, 1], R[..., 0, 0])
+    return alpha, beta, gamma
+
+class HelmertKey():
+    """Immutable, compiled transformation Key.
+
+    Built once from the parameter vector [dx, dy, dz, scale, rx, ry, rz]
+    returned by Helmert_transform; caches the rotation matrix R, the scaled
+    rotation M = q*R, the 4x4 homogeneous matrix and the analytic inverse,
+    so applying the same Key to many batches decodes the angles only once.
+    Indexing and np.asarray give the parameter vector, so a Key can be used
+    wherever a parameter vector is expected.
+    R, if given, is used instead of decoding the angles of x; inverse and
+    composed Keys are built from their matrices this way, their angles
+    (derived with Rotation_angles) only describe them.
+    """
+    __slots__ = ('parameters', 'T', 'q', 'R', 'M', 'matrix', '_inverse')
+
+    def __init__(self, x, R=None):
+        x = np.array(x, dtype=float).reshape(7)
+        x.setflags(write=False)
+        if R is None:
+            R = Rotation_matrix(x[4:7])
+        else:
+            R = np.array(R, dtype=float).reshape(3, 3)
+        M = x[3] * R
+        matrix = np.eye(4)
+        matrix[:3, :3] = M
+        matrix[:3, 3] = x[0:3]
+        for array in (R, M, matrix):
+            array.setflags(write=False)
+        set_slot = object.__setattr__
+        set_slot(self, 'parameters', x)
+        set_slot(self, 'T', x[0:3])
+        set_slot(self, 'q', float(x[3]))
+        set_slot(self, 'R', R)
+        set_slot(self, 'M', M)
+        set_slot(self, 'matrix', matrix)
+        set_slot(self, '_inverse', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("HelmertKey is immutable")
+
+    def __reduce__(self):
+        # Rebuilt from the parameters and R, so pickle and copy bypass
+        # __setattr__ and keep the matrices of composed Keys
+        return (HelmertKey, (tuple(self.parameters), self.R))
+
+    def __getitem__(self, index):
+        return self.parameters[index]
+
+    def __len__(self):
+        return 7
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.parameters, dtype=dtype)
+
+    def __repr__(self):
+        return "HelmertKey({})".format(np.array2string(self.parameters,
+                                                       separator=', '))
+
+    @property
+    def inverse(self):
+        """Key of the inverse transformation X = R.T @ (Y - T) / q"""
+        if self._inverse is None:
+            R_inv = self.R.T
+            T_inv = -(R_inv @ self.T) / self.q
+            angles = tuple(float(angle) for angle in Rotation_angles(R_inv))
+            inverse = HelmertKey(tuple(T_inv) + (1 / self.q,) + angles,
+                                 R=R_inv)
+            object.__setattr__(inverse, '_inverse', self)
+            object.__setattr__(self, '_inverse', inverse)
+        return self._inverse
+
+    def apply(self, points):
+        """T + q*R @ X for an (N,3) (or (3,)) array of points"""
+        return np.asarray(points, dtype=float) @ self.M.T + self.T
+
+    def apply_inverse(self, points):
+        """Inverse transformation of an (N,3) (or (3,)) array of points"""
+        return self.inverse.apply(points)
+
+    def then(self, other):
+        """Key of this transformation followed by other (a Key or parameter
+        vector): T = q2*R2 @ T1 + T2, q = q1*q2, R = R2 @ R1. The product
+        R is kept, the angles are not decoded again (they lose precision
+        near beta = +-pi/2)"""
+        other = as_key(other)
+        R = other.R @ self.R
+        T = other.M @ self.T + other.T
+        angles = tuple(float(angle) for angle in Rotation_angles(R))
+        return HelmertKey(tuple(T) + (self.q * other.q,) + angles, R=R)
+
+def as_key(x):
+    """Returns x as a HelmertKey, compiling parameter vectors"""
+    if isinstance(x, HelmertKey):
+        return x
+    return HelmertKey(x)
+
+def Transform_array(x, From_array, out=None, chunk_size=1048576,
+                    workers=None):
+    """Applies the transformation Key to an (N,3) array, e.g. a np.memmap.
+    Results go to out (which may be From_array itself for an in-place
+    transform) chunk by chunk, without copies of the whole array.
+    Chunks are processed on a thread pool of workers threads (default: all
+    cores), matmul releases the GIL so the chunks run in parallel."""
+    if out is None:
+        out = np.empty(np.shape(From_array), dtype=np.result_type(
+            From_array, np.float64))
+    if np.shape(out) != np.shape(From_array) or np.shape(out)[-1] != 3:
+        raise ValueError("From_array and out have to be (N,3) arrays")
+    key = as_key(x)
+    M = key.M
+    T = key.T
+    def transform_chunk(start):
+        stop = min(start + chunk_size, len(From_array))
+        np.matmul(From_array[start:stop], M.T, out=out[start:stop])
+        out[start:stop] += T
+    starts = range(0, len(From_array), chunk_size)
+    if len(starts) <= 1 or workers == 1:
+        for start in starts:
+            transform_chunk(start)
     else:
-        print('Not enough identical points for transformation calculations.')
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            list(pool.map(transform_chunk, starts))
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+def Transformation(x, From, out=None, workers=None, Cxx=None):
+    """3D Helmert transformation with known transformation Key
+    From is a PointSet or a dictionary of points
+    x is a HelmertKey or the parameter vector
+    (Rotation matrix parameters, Translation vector and scale in tuple)
+    Returns the transformed points in the same container type as From.
+    With the parameter covariance Cxx (see Helmert_transform return_stats)
+    a PointSet is returned whose cov holds the propagated covariance of
+    every transformed point.
+    From can also be an (N,3) array or np.memmap, see Transform_array for
+    the out and workers arguments of this array mode"""
+    key = as_key(x)
+    if isinstance(From, np.ndarray):
+        return Transform_array(key, From, out=out, workers=workers)
+    Points = as_pointset(From)
+    cov = Points.cov
+    if Cxx is not None:
+        cov = Propagate_covariance(key, Cxx, Points.coords, Points.cov)
+    elif cov is not None:
+        cov = key.M @ cov @ key.M.T
+    From_transformed = PointSet(Points.names, key.apply(Points.coords), cov)
+    if isinstance(From, PointSet) or Cxx is not None:
+        return From_transformed
+    return From_transformed.to_dict()
+
+def Well_spread_triplets(From_array, candidates=1):
+    """Indices (candidates,3) of well-conditioned point triplets.
+    Point 1 is the farthest from the centroid, point 2 the farthest from
+    point 1 and point 3 maximizes the triangle area with them; further
+    candidates use the next largest triangle areas"""
+    From_array = np.asarray(From_array, dtype=float)
+    centroid = From_array.mean(axis=0)
+    first = np.argmax(((From_array - centroid)**2).sum(axis=1))
+    second = np.argmax(((From_array - From_array[first])**2).sum(axis=1))
+    area = np.linalg.norm(np.cross(From_array[second] - From_array[first],
+                                   From_array - From_array[first]), axis=1)
+    area[[first, second]] = -1
+    third = np.argsort(-area)[:min(candidates, len(From_array) - 2)]
+    return np.stack((np.full(len(third), first), np.full(len(third), second),
+                     third), axis=1)
+
+def Helmert_aproximate_parameters(From, To, candidates=1):
+    """Approximate parameters from three identical points, chosen by
+    Well_spread_triplets. With candidates > 1 that many triplets are
+    tried and the one with the smallest residuals over all identical points
+    is kept. Returns (R0, x0)"""
+    identicals, From_array, To_array = Identical_points(From, To)
+    if len(identicals) < 3:
+        raise ValueError('Not enough identical points for transformation '
+                         'calculations.')
+    triplets = Well_spread_triplets(From_array, candidates)
+    solutions = [Three_point_parameters(From_array[triplet],
+                                        To_array[triplet])
+                 for triplet in triplets]
+    if len(solutions) == 1:
+        return solutions[0]
+    # All candidates scored against all points in one stacked evaluation
+    x = np.array([x0 for R0, x0 in solutions])
+    M = x[:, 3, None, None] * np.array([R0 for R0, x0 in solutions])
+    TFrom = np.einsum('kij,nj->kni', M, From_array) + x[:, None, 0:3]
+    best = np.argmin(((TFrom - To_array)**2).sum(axis=(1, 2)))
+    return solutions[best]
+
+def Three_point_parameters(From_points, To_points):
+    """Approximate parameters from the first three rows of two (3,3)
+    arrays of identical points. Returns (R0, x0)"""
+    point1_To = np.array(To_points[0], dtype=float)
+    point2_To = np.array(To_points[1], dtype=float)
+    point3_To = np.array(To_points[2], dtype=float)
+    point1_To_original = point1_To.copy().transpose()
+    point1_From = np.array(From_points[0], dtype=float)
+    point2_From = np.array(From_points[1], dtype=float)
+    point3_From = np.array(From_points[2], dtype=float)
+    point1_From_original = point1_From.copy().transpose()
+    # Translation of the points to have origin in point 1:
+    point2_To = point2_To - point1_To
+    point3_To = point3_To - point1_To
+    point1_To = np.array([0,0,0])              # is an int Array
+    point2_From = point2_From - point1_From
+    point3_From = point3_From - point1_From
+    point1_From = np.array([0,0,0])
+    # Calculating the aproximate parameters
+    # (based on Angle between planes paper)
+    # First rotation angle calculations
+    psi_To   = math.atan2(point2_To[1],  point2_To[0])
+    psi_From = math.atan2(point2_From[1],point2_From[0])
+#    print(psi_To, psi_From)
+    # Applying the calculated angle to point 2 and 3
+    FirstZrotation2_To   = Z_Rotation(psi_To)   @ point2_To.transpose()
+    FirstZrotation3_To   = Z_Rotation(psi_To)   @ point3_To.transpose()
+    FirstZrotation2_From = Z_Rotation(psi_From) @ point2_From.transpose()
+    FirstZrotation3_From = Z_Rotation(psi_From) @ point3_From.transpose()
+#    print(FirstZrotation2_To,FirstZrotation3_To)
+#    print(FirstZrotation2_From, FirstZrotation3_From)
+    # Calculating second rotation angle from the first rotated coordinates
+#    fi_To = math.atan2(-FirstZrotation2_To[0],FirstZrotation2_To[2])
+#    fi_From = math.atan2(-FirstZrotation2_From[0],FirstZrotation2_From[2])
+    fi_To   = math.atan2(FirstZrotation2_To[2]  ,FirstZrotation2_To[0])     # Markus
+    fi_From = math.atan2(FirstZrotation2_From[2],FirstZrotation2_From[0])   # Markus
+#    print(fi_To, fi_From)
+    # Applying the calculated angle to point 3
+    SecondYrotation3_To =   Y_Rotation(fi_To)   @ FirstZrotation3_To.transpose()
+    SecondYrotation3_From = Y_Rotation(fi_From) @ FirstZrotation3_From.transpose()
+    # Calculating third rotation angle
+#    theta_To = math.atan2(SecondYrotation3_To[1],SecondYrotation3_To[0])
+#    theta_From = math.atan2(SecondYrotation3_From[1], SecondYrotation3_From[0])
+    theta_To =   math.atan2(SecondYrotation3_To[2],   SecondYrotation3_To[1])     # Markus
+    theta_From = math.atan2(SecondYrotation3_From[2], SecondYrotation3_From[1])   # Markus
+#    print(theta_To, theta_From)
+    # Using all three angles, the full rotation matrix for From To is made
+#    R_To = Z_Rotation(theta_To) @ Y_Rotation(fi_To) @ Z_Rotation(psi_To)
+#    R_From = Z_Rotation(theta_From) @ Y_Rotation(fi_From) @ Z_Rotation(
+#                                                                  psi_From)
+    R_To =   X_Rotation(theta_To)   @ Y_Rotation(fi_To)   @ Z_Rotation(psi_To)     # Markus
+    R_From = X_Rotation(theta_From) @ Y_Rotation(fi_From) @ Z_Rotation(psi_From)   # Markus
+    # The translation vector is calculated by rotating the original
+    # point1_From to the "To" coordinate frame. By substracting the rotated
+    # point1_From from point1_To we get the translation vector.
+    R0 = R_To.transpose() @ R_From
+    # Scale as the ratio of the triangle perimeters
+    q0 = (np.linalg.norm(point2_To) + np.linalg.norm(point3_To) +
+          np.linalg.norm(point3_To - point2_To)) / (
+          np.linalg.norm(point2_From) + np.linalg.norm(point3_From) +
+          np.linalg.norm(point3_From - point2_From))
+    Translation = tuple(point1_To_original -
+                        q0 * R0 @ point1_From_original)
+#    Translation = tuple(point1_To_original - point1_From_original)   # Markus
+    # Euler rotation angles - rotating points, not CS
+    R_angles = tuple(float(angle) for angle in Rotation_angles(R0))
+    x0 = Translation + (float(q0),) + R_angles
     return R0, x0# RX + T
 
+def Closed_form_parameters(From_array, To_array, weights=None):
+    """Closed-form similarity transformation (Horn/Umeyama) between (N,3)
+    arrays of identical points, or stacks of them (...,N,3).
+    weights are optional per-point weights (...,N), zero excludes a point.
+    Returns x (...,7) as (TX,TY,TZ,q,alpha,beta,gamma) for To = T + q*R@From"""
+    From_array = np.asarray(From_array, dtype=float)
+    To_array = np.asarray(To_array, dtype=float)
+    if weights is None:
+        weights = np.ones(From_array.shape[:-1])
+    w = np.asarray(weights, dtype=float)
+    w = w / w.sum(axis=-1, keepdims=True)
+    mu_From = np.einsum('...n,...ni->...i', w, From_array)
+    mu_To = np.einsum('...n,...ni->...i', w, To_array)
+    From_c = From_array - mu_From[..., None, :]
+    To_c = To_array - mu_To[..., None, :]
+    # Cross-covariance of the centred sets, To in rows and From in columns
+    Sigma = np.einsum('...n,...ni,...nj->...ij', w, To_c, From_c)
+    U, D, Vt = np.linalg.svd(Sigma)
+    # Reflection guard, keeps R a proper rotation
+    S = np.ones(D.shape)
+    S[..., 2] = np.sign(np.linalg.det(U) * np.linalg.det(Vt))
+    R = U @ (S[..., :, None] * Vt)
+    var_From = np.einsum('...n,...ni,...ni->...', w, From_c, From_c)
+    q = (D * S).sum(axis=-1) / var_From
+    T = mu_To - q[..., None] * np.einsum('...ij,...j->...i', R, mu_From)
+    alpha, beta, gamma = Rotation_angles(R)
+    return np.concatenate((T, np.stack((q, alpha, beta, gamma), axis=-1)),
+                          axis=-1)
+
+def Forward_model(x, From_array):
+    """Transformed coordinates T + q * R @ X for an (N,3) array of points.
+    x are the transform parameters (TX,TY,TZ,q,alpha,beta,gamma)"""
+    From_array = np.asarray(From_array, dtype=float).reshape(-1, 3)
+    M = x[3] * Rotation_matrix(x[4:7])
+    return From_array @ M.T + np.asarray(x[0:3], dtype=float)
+
+def Jacobian(x, From_array):
+    """Design matrix (3N x 7) of the 7-parameter transformation for an
+    (N,3) array of points, rows ordered X1,Y1,Z1,X2,... like Build_TFrom"""
+    From_array = np.asarray(From_array, dtype=float).reshape(-1, 3)
+    RX = X_Rotation(x[4])
+    RY = Y_Rotation(x[5])
+    RZ = Z_Rotation(x[6])
+    # Derivatives of q*R with respect to q, alpha, beta and gamma
+    dM = np.stack((RX @ RY @ RZ,
+                   x[3] * dX_Rotation(x[4]) @ RY @ RZ,
+                   x[3] * RX @ dY_Rotation(x[5]) @ RZ,
+                   x[3] * RX @ RY @ dZ_Rotation(x[6])))
+    A = np.zeros((len(From_array), 3, 7))
+    A[:, [0, 1, 2], [0, 1, 2]] = 1
+    A[:, :, 3:] = np.einsum('kij,nj->nik', dM, From_array)
+    return A.reshape(-1, 7)
+
 def Build_TFrom(x,From,identicals):
     """x are the transform parameters T,q,R in a tuple"""
-    TFrom = np.array([]) #Transformed "From" coords
-    for i in range(len(identicals)):
-        PointID = identicals[i] #string
-        From_ith = np.asarray(From[PointID][:3]) # array
-        R = Rotation_matrix(x[4:])
-        T = np.array([x[0:3]])
-        TFrom_ith = T + x[3] * R @ From_ith
-        TFrom = np.append(TFrom,TFrom_ith)
-    return TFrom
+    From_array = np.array([From[PointID][:3] for PointID in identicals],
+                          dtype=float)
+    return Forward_model(x, From_array).ravel()
 
 def Build_A(x,From,identicals):
     # x (TX,TY,TZ,q,alpha,beta,gamma)
-    equation_count = 3 * len(identicals)
-    RX = X_Rotation(x[4])
-    RY = Y_Rotation(x[5])
-    RZ = Z_Rotation(x[6])
-    dRX = dX_Rotation(x[4])
-    dRY = dY_Rotation(x[5])
-    dRZ = dZ_Rotation(x[6])
-    R = Rotation_matrix(x[4:7])
-    A = np.zeros((equation_count,7))
-    for i in range(len(identicals)):
-        iii = 3*i
-        PointID = identicals[i] #string
-        From_ith = np.asarray(From[PointID][:3]) # array
-        A[iii,0] = 1
-        A[iii+1,1] = 1
-        A[iii+2,2] = 1
-        D_alpha = dRX @ RY @ RZ @ From_ith
-        D_beta = RX @ dRY @ RZ @ From_ith
-        D_gamma = RX @ RY @ dRZ @ From_ith
-        D_q =  R @ From_ith
-        A[iii:iii+3,3] = D_q
-        A[iii:iii+3,4] = D_alpha
-        A[iii:iii+3,5] = D_beta
-        A[iii:iii+3,6] = D_gamma
-    return A
-
-
-def Helmert_transform(From, To):
+    From_array = np.array([From[PointID][:3] for PointID in identicals],
+                          dtype=float)
+    return Jacobian(x, From_array)
+
+
+def Normalized_parameters(x):
+    """Parameter vector with the angles normalized to [-pi, pi)"""
+    return np.array([x[0], x[1], x[2], x[3],
+                     a(float(x[4]), a.T_RAD, True).angle,
+                     a(float(x[5]), a.T_RAD, True).angle,
+                     a(float(x[6]), a.T_RAD, True).angle])
+
+def Centroids(From_array, To_array, weights=None):
+    """Centroids of (...,N,d) arrays of identical points, weighted with the
+    optional per-point weights (...,N) so that points of zero weight (masked
+    or rejected) do not shift them. Returns (From_centroid, To_centroid)"""
+    From_array = np.asarray(From_array, dtype=float)
+    To_array = np.asarray(To_array, dtype=float)
+    if weights is None:
+        weights = np.ones(From_array.shape[:-1])
+    w = np.asarray(weights, dtype=float)
+    w = w / w.sum(axis=-1, keepdims=True)
+    return (np.einsum('...n,...ni->...i', w, From_array),
+            np.einsum('...n,...ni->...i', w, To_array))
+
+def Reduced_coordinates(From_array, To_array, weights=None):
+    """Centroid reduction of the estimators of the package: (...,N,d)
+    arrays of identical points minus their (weighted, see Centroids)
+    centroids. Coordinates far from the origin (ECEF) give a badly
+    conditioned normal matrix, which the reduction avoids; the parameters
+    are converted with Centered_parameters and Uncentered_parameters.
+    Returns (From_reduced, To_reduced, From_centroid, To_centroid)"""
+    From_array = np.asarray(From_array, dtype=float)
+    To_array = np.asarray(To_array, dtype=float)
+    From_centroid, To_centroid = Centroids(From_array, To_array, weights)
+    return (From_array - From_centroid[..., None, :],
+            To_array - To_centroid[..., None, :],
+            From_centroid, To_centroid)
+
+def Centered_parameters(x, From_centroid, To_centroid, model=None):
+    """Parameters of the same transformation between the point sets
+    reduced to their centroids, From - From_centroid and
+    To - To_centroid: the translation becomes T + q*R@From_centroid -
+    To_centroid, scale and angles are unchanged.
+    model is an optional transformation model (see models.py), all of
+    them have the translations as their first d parameters.
+    Stacks (...,p) of parameters with (...,d) centroids are converted row
+    by row"""
+    forward = Forward_model if model is None else model.forward
+    x = np.array(x, dtype=float)
+    d = np.shape(To_centroid)[-1]
+    From_centroid = np.broadcast_to(From_centroid, x.shape[:-1] + (d,))
+    To_centroid = np.broadcast_to(To_centroid, x.shape[:-1] + (d,))
+    for index in np.ndindex(x.shape[:-1]):
+        x_i = x[index]
+        x_i[0:d] = forward(x_i, From_centroid[index])[0] - To_centroid[index]
+    return x
+
+def Uncentered_parameters(x, From_centroid, To_centroid, model=None):
+    """Inverse of Centered_parameters, T = t + To_centroid -
+    q*R@From_centroid"""
+    forward = Forward_model if model is None else model.forward
+    x = np.array(x, dtype=float)
+    d = np.shape(To_centroid)[-1]
+    From_centroid = np.broadcast_to(From_centroid, x.shape[:-1] + (d,))
+    To_centroid = np.broadcast_to(To_centroid, x.shape[:-1] + (d,))
+    for index in np.ndindex(x.shape[:-1]):
+        x_i = x[index]
+        # q*R@From_centroid, the forward model without the translation
+        rotated = forward(x_i, From_centroid[index])[0] - x_i[0:d]
+        x_i[0:d] = x_i[0:d] + To_centroid[index] - rotated
+    return x
+
+def Uncentering_jacobian(x, From_centroid, model=None):
+    """Derivative (p x p) of Uncentered_parameters with respect to the
+    centered parameters x, propagates their Qxx or Cxx: J @ Cxx @ J.T"""
+    jacobian = Jacobian if model is None else model.jacobian
+    d = np.size(From_centroid)
+    J = np.eye(len(x))
+    J[0:d, d:] = -jacobian(x, From_centroid)[:, d:]
+    return J
+
+def Whitening_matrices(cov):
+    """Inverse Cholesky factors L^-1 of (N,d,d) covariance blocks, so that
+    L^-1 @ v has unit covariance. Block-diagonal weight P = C^-1 is then
+    applied block by block, never as a dN x dN matrix"""
+    cov = np.asarray(cov, dtype=float)
+    L = np.linalg.cholesky(cov.reshape((-1,) + cov.shape[-2:]))
+    return np.linalg.inv(L)
+
+def _Whitener(To_array, weights=None, cov=None):
+    """Returns (whiten, w): whiten(v) applies the point weights and the
+    covariance whitening to a (dN,) vector or (dN,p) matrix, w are the
+    weights repeated per coordinate (dN,)"""
+    dimension = np.shape(To_array)[-1]
+    count = np.size(To_array) // dimension
+    if weights is None:
+        w = np.ones(count * dimension)
+    else:
+        w = np.repeat(np.asarray(weights, dtype=float), dimension)
+    sqrt_w = np.sqrt(w)
+    W = None if cov is None else Whitening_matrices(cov)
+    def whiten(v):
+        # v is (dN,) or (dN,p), whitened block by block and weighted
+        if W is not None:
+            v = np.einsum('nij,nj...->ni...', W,
+                          v.reshape((-1, dimension) + v.shape[1:]))
+            v = v.reshape((-1,) + v.shape[2:])
+        return (v.T * sqrt_w).T
+    return whiten, w
+
+def Helmert_iterations(x0, From_array, To_array, weights=None, cov=None,
+                       max_iter=10, threshold=0.0000000001, model=None,
+                       callback=None):
+    """Gauss-Newton iterations of the 7-parameter transformation on (N,3)
+    arrays of identical points, starting from x0.
+    weights are optional per-point weights (N,), zero excludes a point.
+    cov are optional (N,3,3) covariance blocks of the coordinate
+    differences, applied through Cholesky whitening.
+    model is an optional transformation model (see models.py) providing
+    forward(x, From_array) and jacobian(x, From_array); the 7-parameter
+    Forward_model and Jacobian are used by default.
+    callback, if given, is called with one record (dict) per iteration:
+    'iteration', 'metric', 'step_norm' (norm of dx) and the seconds spent
+    in 'time_jacobian', 'time_solve' and 'time_forward'.
+    Returns (x, iterations, metric, L), metric being the last linearization
+    error max|vI - vII| (0 when no iteration was made) and L the Cholesky
+    factor of the last (weighted) normal matrix A.T @ P @ A.
+    The coordinates are used as given, see Helmert_adjustment for the
+    centroid-reduced solve"""
+    forward = Forward_model if model is None else model.forward
+    jacobian = Jacobian if model is None else model.jacobian
+    whiten, w = _Whitener(To_array, weights, cov)
+    To_array = np.asarray(To_array, dtype=float).ravel()
+    x = np.array(x0, dtype=float)
+    TFrom = forward(x, From_array).ravel()
+    metric = 0.0
+    counter = 0
+    L = None
+    while (counter == 0 or metric > threshold) and (counter < max_iter):
+        start = time.perf_counter()
+        A = jacobian(x, From_array)
+        jacobian_done = time.perf_counter()
+        l_prime = TFrom - To_array
+#        l_prime = TTo - To_array    # Markus
+        Aw = whiten(A)
+        L = np.linalg.cholesky(Aw.transpose() @ Aw)
+        y = np.linalg.solve(L, Aw.transpose() @ whiten(l_prime))
+        dx = -np.linalg.solve(L.transpose(), y)
+        x += dx
+#        pretty_print(x)
+        solve_done = time.perf_counter()
+        vI = A @ dx + l_prime
+        TFrom = forward(x, From_array).ravel()
+        vII = TFrom - To_array
+        v = (vI-vII)[w > 0]
+        metric = max(abs(v))
+        counter += 1
+        if callback is not None:
+            callback({'iteration': counter,
+                      'metric': float(metric),
+                      'step_norm': float(np.linalg.norm(dx)),
+                      'time_jacobian': jacobian_done - start,
+                      'time_solve': solve_done - jacobian_done,
+                      'time_forward': time.perf_counter() - solve_done})
+    if L is None:
+        Aw = whiten(jacobian(x, From_array))
+        L = np.linalg.cholesky(Aw.transpose() @ Aw)
+    return x, counter, metric, L
+
+# Termination reasons of the solvers, stats['status'] of Helmert_transform
+MAX_ITERATIONS = 0
+CONVERGED_LINEARIZATION = 1
+CONVERGED_STEP = 2
+CONVERGED_GRADIENT = 3
+CLOSED_FORM = 4
+STATUS_MESSAGES = {
+    MAX_ITERATIONS: "Too many iterations",
+    CONVERGED_LINEARIZATION: "Linearization error below threshold",
+    CONVERGED_STEP: "Step size below threshold",
+    CONVERGED_GRADIENT: "Gradient below threshold",
+    CLOSED_FORM: "Closed-form solution, no iterations",
+    }
+
+def Levenberg_marquardt_iterations(x0, From_array, To_array, weights=None,
+                                   cov=None, max_iter=50,
+                                   threshold=0.0000000001, gtol=0.0000000001,
+                                   model=None, callback=None):
+    """Damped Gauss-Newton (Levenberg-Marquardt) iterations, arguments as
+    Helmert_iterations.
+    The normal matrix is damped by mu * diag(A.T @ P @ A) (Marquardt
+    scaling, so the translations, the scale and the angles are damped
+    alike) and mu is adapted from the gain ratio of each step (Nielsen).
+    Rejected steps only raise the damping and cost a forward model, no
+    Jacobian. Stops when, at an accepted point,
+    - the undamped Gauss-Newton step moves no point by more than
+      threshold (max|A @ dx|) or its predicted decrease of the cost is
+      within the rounding of the cost; that step is then taken. A damped
+      step is small whenever the damping is large, so it never signals
+      convergence, or
+    - the gradient is orthogonal to the residuals: the largest cosine
+      |a_i.T @ P @ v| / (|a_i| |v|) between a column of A and the
+      residuals is below gtol,
+    or after max_iter steps (accepted or rejected), or once the damping
+    leaves x unchanged, both with status MAX_ITERATIONS.
+    callback records have the keys of Helmert_iterations ('metric' being
+    max|A @ dx| of the undamped step at the current point) plus
+    'damping' and 'accepted'.
+    Returns (x, iterations, status, L), status being one of
+    CONVERGED_STEP, CONVERGED_GRADIENT or MAX_ITERATIONS and L the
+    Cholesky factor of the undamped normal matrix at x"""
+    forward = Forward_model if model is None else model.forward
+    jacobian = Jacobian if model is None else model.jacobian
+    whiten, w = _Whitener(To_array, weights, cov)
+    To_array = np.asarray(To_array, dtype=float).ravel()
+    To_scale = np.abs(whiten(np.abs(To_array)))
+    x = np.array(x0, dtype=float)
+    v = whiten(forward(x, From_array).ravel() - To_array)
+    cost = v @ v
+    counter = 0
+    status = MAX_ITERATIONS
+    mu = 0.001
+    nu = 2.0
+    eps = np.finfo(float).eps
+    refresh = True
+    while counter < max_iter:
+        start = time.perf_counter()
+        if refresh:
+            A = jacobian(x, From_array)
+            Aw = whiten(A)
+            N = Aw.transpose() @ Aw
+            g = Aw.transpose() @ v
+            D = np.diag(N).copy()
+            D[D == 0] = 1
+            column_norms = np.sqrt(D)
+            vv = math.sqrt(cost)
+            if vv == 0 or np.max(np.abs(g) / column_norms) <= gtol * vv:
+                status = CONVERGED_GRADIENT
+                break
+            step = np.linalg.solve(N, g)
+            metric = np.max(np.abs(A @ step)[w > 0])
+            # Rounding error of the cost, each residual is rounded to the
+            # resolution of the coordinates it is computed from
+            rounding = eps * (cost + 2 * np.abs(v) @ To_scale)
+            if metric <= threshold or g @ step <= rounding:
+                # A decrease below the rounding cannot be verified, every
+                # damped step would be rejected until mu overflows. The
+                # undamped step is taken without the test instead
+                x = x - step
+                status = CONVERGED_STEP
+                break
+            refresh = False
+        jacobian_done = time.perf_counter()
+        dx = -np.linalg.solve(N + mu * np.diag(D), g)
+        solve_done = time.perf_counter()
+        x_new = x + dx
+        if np.array_equal(x_new, x):
+            # Damped below the resolution of x, further rejections cannot
+            # make progress (the status stays MAX_ITERATIONS)
+            break
+        v_new = whiten(forward(x_new, From_array).ravel() - To_array)
+        cost_new = v_new @ v_new
+        # Gain ratio, actual over predicted decrease of the cost
+        predicted = dx @ (mu * D * dx - g)
+        rho = (cost - cost_new) / predicted if predicted > 0 else -1.0
+        accepted = rho > 0
+        if accepted:
+            x, v, cost = x_new, v_new, cost_new
+            mu *= max(1 / 3, 1 - (2 * rho - 1)**3)
+            nu = 2.0
+            refresh = True
+        else:
+            mu *= nu
+            nu *= 2
+        counter += 1
+        if callback is not None:
+            callback({'iteration': counter,
+                      'metric': float(metric),
+                      'step_norm': float(np.linalg.norm(dx)),
+                      'damping': float(mu),
+                      'accepted': bool(accepted),
+                      'time_jacobian': jacobian_done - start,
+                      'time_solve': solve_done - jacobian_done,
+                      'time_forward': time.perf_counter() - solve_done})
+    if refresh:
+        Aw = whiten(jacobian(x, From_array))
+        N = Aw.transpose() @ Aw
+    L = np.linalg.cholesky(N)
+    return x, counter, status, L
+
+def Helmert_statistics(x, From_array, To_array, L, weights=None, cov=None,
+                       model=None):
+    """A-posteriori accuracy of an adjusted transformation.
+    L is the Cholesky factor returned by Helmert_iterations, weights, cov
+    and model the same as given to it. Returns a dict with
+    'residuals' (N,3) To minus transformed From, 'sigma0_squared' the
+    a-posteriori variance factor v.T @ P @ v / (3N - 7), 'redundancy',
+    'Qxx' the 7x7 cofactor matrix inv(A.T @ P @ A) and
+    'Cxx' = sigma0_squared * Qxx, the parameter covariance
+    (dimensions and parameter count follow the model)"""
+    forward = Forward_model if model is None else model.forward
+    To_array = np.asarray(To_array, dtype=float)
+    residuals = To_array - forward(x, From_array)
+    v = residuals
+    if cov is not None:
+        v = np.einsum('nij,nj->ni', Whitening_matrices(cov), v)
+    vv = (v**2).sum(axis=1)
+    if weights is None:
+        weights = np.ones(len(v))
+    weights = np.asarray(weights, dtype=float)
+    redundancy = To_array.shape[-1] * np.count_nonzero(weights) - len(x)
+    sigma0_squared = (weights @ vv) / redundancy if redundancy > 0 else np.nan
+    L_inv = np.linalg.inv(L)
+    Qxx = L_inv.transpose() @ L_inv
+    return {'residuals': residuals,
+            'sigma0_squared': sigma0_squared,
+            'redundancy': redundancy,
+            'Qxx': Qxx,
+            'Cxx': sigma0_squared * Qxx}
+
+def Helmert_adjustment(x0, From_array, To_array, weights=None, cov=None,
+                       solver="gauss_newton", max_iter=None,
+                       threshold=0.0000000001, model=None, callback=None,
+                       centered=True, return_stats=False):
+    """Estimation layer shared by the estimators of the package.
+    Reduces the (N,d) arrays of identical points to their (weighted)
+    centroids (Reduced_coordinates), converts x0 accordingly, runs
+    Helmert_iterations or Levenberg_marquardt_iterations (solver
+    "gauss_newton" or "levenberg_marquardt") on the reduced coordinates
+    and converts the result back (Uncentered_parameters); centered=False
+    solves on the coordinates as given.
+    weights, cov, model and callback are passed on to the iterations,
+    max_iter defaults to the default of the solver.
+    Returns (x, iterations, status) with status one of STATUS_MESSAGES,
+    with return_stats=True the Helmert_statistics dict is appended, its
+    Qxx and Cxx converted to the returned parameters (Uncentering_jacobian)
+    """
+    if centered:
+        From_reduced, To_reduced, From_centroid, To_centroid = \
+            Reduced_coordinates(From_array, To_array, weights)
+    else:
+        From_reduced = np.asarray(From_array, dtype=float)
+        To_reduced = np.asarray(To_array, dtype=float)
+        From_centroid = np.zeros(From_reduced.shape[-1])
+        To_centroid = np.zeros(To_reduced.shape[-1])
+    x0 = Centered_parameters(x0, From_centroid, To_centroid, model)
+    if solver == "levenberg_marquardt":
+        x, counter, status, L = Levenberg_marquardt_iterations(
+            x0, From_reduced, To_reduced, weights, cov,
+            max_iter=50 if max_iter is None else max_iter,
+            threshold=threshold, model=model, callback=callback)
+    elif solver == "gauss_newton":
+        max_iter = 10 if max_iter is None else max_iter
+        x, counter, metric, L = Helmert_iterations(
+            x0, From_reduced, To_reduced, weights, cov, max_iter=max_iter,
+            threshold=threshold, model=model, callback=callback)
+        status = CONVERGED_LINEARIZATION
+        if counter == max_iter and metric > threshold:
+            status = MAX_ITERATIONS
+    else:
+        raise ValueError("Unknown solver: {}".format(solver))
+    x_reduced = x
+    x = Uncentered_parameters(x_reduced, From_centroid, To_centroid, model)
+    if not return_stats:
+        return x, counter, status
+    stats = Helmert_statistics(x_reduced, From_reduced, To_reduced, L,
+                               weights=weights, cov=cov, model=model)
+    J = Uncentering_jacobian(x_reduced, From_centroid, model)
+    stats['Qxx'] = J @ stats['Qxx'] @ J.T
+    stats['Cxx'] = J @ stats['Cxx'] @ J.T
+    return x, counter, status, stats
+
+def Propagate_covariance(x, Cxx, From_array, cov_From=None):
+    """(N,3,3) covariances of transformed points T + q*R@X, from the 7x7
+    parameter covariance Cxx and optional (N,3,3) covariances of the
+    points themselves, in one batched pass:
+    C_i = J_i @ Cxx @ J_i.T + (q*R) @ C_From_i @ (q*R).T"""
+    J = Jacobian(x, From_array).reshape(-1, 3, 7)
+    cov = np.einsum('nik,kl,njl->nij', J, np.asarray(Cxx, dtype=float), J)
+    if cov_From is not None:
+        M = x[3] * Rotation_matrix(x[4:7])
+        cov += M @ np.asarray(cov_From, dtype=float) @ M.T
+    return cov
+
+def Identical_covariances(From, To, identicals, x):
+    """(N,3,3) covariances of To - T - q*R@From for the identical points,
+    from the covariances carried by the PointSets: To.cov plus From.cov
+    rotated and scaled into the To frame with the parameters x"""
+    From = as_pointset(From)
+    To = as_pointset(To)
+    if From.cov is None and To.cov is None:
+        raise ValueError("Weighted estimation needs PointSets with covariance")
+    cov = np.zeros((len(identicals), 3, 3))
+    if To.cov is not None:
+        cov += To.cov[[To.index[name] for name in identicals]]
+    if From.cov is not None:
+        M = x[3] * Rotation_matrix(x[4:7])
+        cov += M @ From.cov[[From.index[name] for name in identicals]] @ M.T
+    return cov
+
+def Helmert_transform(From, To, solver="gauss_newton",
+                      initial="approximate", weighted=False,
+                      return_stats=False, cache=None, callback=None,
+                      centered=True):
     """
     Perform Helmert transformation to align points from one
     coordinate system to another.
@@ -185,13 +797,50 @@ def Helmert_transform(From, To):
 
     Parameters
     ----------
-    From : dict
-        Dictionary containing original points as keys and
-        their respective coordinates as values in the form
-        (x, y, z).
-    To : dict
-        Dictionary containing target points as keys and their
-        respective coordinates as values in the form (x, y, z).
+    From : PointSet or dict
+        Original points, either as a PointSet or as a dictionary
+        with point names as keys and their respective
+        coordinates as values in the form (x, y, z).
+    To : PointSet or dict
+        Target points, in the same form as From.
+    solver : str, optional
+        "gauss_newton" (default) iterates from the initial
+        parameters, "levenberg_marquardt" takes damped steps
+        (see Levenberg_marquardt_iterations), for poor
+        starting values, "closed_form" returns the Horn/Umeyama
+        absolute-orientation solution without iterations
+        (unweighted, see weighted).
+    initial : str, optional
+        Starting values of the iterations, "approximate" uses
+        the three-point Helmert_aproximate_parameters (best of
+        three well-spread triplets),
+        "closed_form" starts from the closed-form solution.
+    weighted : bool, optional
+        Weight the identical points with their 3x3 covariance
+        matrices, taken from the PointSets (see Note). Not
+        available with solver="closed_form", use
+        initial="closed_form" to start the weighted iterations
+        from it.
+    return_stats : bool, optional
+        Also return the accuracy of the adjustment.
+    cache : HelmertCache, optional
+        Warm-start cache (see cache.py). Unchanged inputs return
+        the stored result, re-measured coordinates of the same
+        identical points start the iterative solvers from the
+        parameters of the last converged run (closed_form always
+        recomputes). Runs ending with MAX_ITERATIONS are not
+        stored.
+    callback : callable, optional
+        Called with one record per iteration (iteration, metric,
+        step_norm and the time spent in the Jacobian build, the
+        normal-equation solve and the forward model, see
+        Helmert_iterations and Levenberg_marquardt_iterations).
+        The records are also returned as 'trace' with
+        return_stats=True.
+    centered : bool, optional
+        Solve with both point sets reduced to their centroids
+        (default) and convert the parameters back, see
+        Reduced_coordinates.
 
     Returns
     -------
@@ -204,13 +853,22 @@ def Helmert_transform(From, To):
         - scale: Scaling factor.
         - rx, ry, rz: Rotational parameters around the x, y,
           and z axes in radians.
+    dict
+        Only with return_stats=True, see Helmert_statistics:
+        'residuals', 'sigma0_squared', 'redundancy', 'Qxx',
+        'Cxx', plus 'identicals' (order of the residual rows),
+        'iterations', 'trace', 'status' (MAX_ITERATIONS when
+        not converged, CLOSED_FORM for solver="closed_form",
+        see STATUS_MESSAGES) and 'message'.
+        Cxx can be passed to Transformation to propagate it to
+        transformed points.
 
     Note
     ----
     - The function uses an iterative approach to refine the
       transformation parameters.
-    - The 'From' and 'To' dictionaries should have identical
-      keys corresponding to the same points.
+    - The 'From' and 'To' point sets are joined by point name,
+      only points present in both are used.
     - The transformation parameters are computed to minimize
       the difference between the transformed 'From'
       coordinates and the 'To' coordinates.
@@ -220,53 +878,86 @@ def Helmert_transform(From, To):
       'Build_TFrom', 'Build_A', 'a', and 'Transformation'
       defined before using this function.
 
-    - The function may print "Too many iterations" if the
-      maximum iteration count is reached without converging
-      to a solution.
+    - With centered=True the parameters, Qxx and Cxx are
+      solved for the reduced coordinates and converted back
+      (Uncentered_parameters, Uncentering_jacobian), they
+      refer to the same [dx, dy, dz, ...] as without.
+
+    - With weighted=True the covariance of each point is
+      To.cov plus From.cov rotated into the To frame with the
+      starting parameters. The block-diagonal weight is applied
+      by Cholesky whitening of each 3x3 block, a 3N x 3N weight
+      matrix is never formed.
+
+    - Reaching the maximum iteration count without converging
+      is reported by stats['status'] == MAX_ITERATIONS.
 
     """
+    if solver not in ("gauss_newton", "levenberg_marquardt", "closed_form"):
+        raise ValueError("Unknown solver: {}".format(solver))
+    if initial not in ("approximate", "closed_form"):
+        raise ValueError("Unknown initial parameters: {}".format(initial))
+    if weighted and solver == "closed_form":
+        raise ValueError("The closed-form solution is unweighted, use "
+                         "initial=\"closed_form\" for weighted=True")
     max_iter = 10
-    R0, x0 = Helmert_aproximate_parameters(From, To)
+    threshold = 0.0000000001  # 0.0000000000001 #fraction of basic unit
+    identicals, From_array, To_array = Identical_points(From, To)
+    x0 = None
+    if cache is not None:
+        key = cache.make_key(identicals, (solver, initial, weighted,
+                                          return_stats, centered))
+        fingerprint = cache.fingerprint(
+            From_array, To_array,
+            as_pointset(From).cov if weighted else None,
+            as_pointset(To).cov if weighted else None)
+        result, x0 = cache.lookup(key, fingerprint)
+        if result is not None:
+            return result
+    # x0 is already set when warm starting from the cache, it is only a
+    # starting vector of the iterative solvers
+    if solver == "closed_form" or (x0 is None and initial == "closed_form"):
+        x0 = Closed_form_parameters(From_array, To_array)
+    elif x0 is None:
+        R0, x0 = Helmert_aproximate_parameters(From, To, candidates=3)
 #    print("Pre-Estimate")
 #    pretty_print(x0)
 #    print("Helmert-Iterations")
-    identicals = list(set(To.keys()) & set(From.keys()))
-    equation_count = 3*len(identicals)
-    dx = np.zeros(7)
-    x = np.array(x0)
-    vI = np.zeros((equation_count))
-    vII = np.zeros((equation_count))
-    To_array = np.empty(0)
-    TFrom = Build_TFrom(x, From, identicals)
-    A = Build_A(x, From, identicals)
-    for i in range(len(identicals)):
-        PointID = identicals[i]  # string
-        To_ith = To[PointID][:3]  # tuple
-        To_array = np.concatenate((To_array, np.array(To_ith)), axis = None)
-    threshold = 0.0000000001  # 0.0000000000001 #fraction of basic unit
-    metric = threshold + 1
-    counter = 0
-    while (metric > threshold) and (counter < max_iter):
-        l_prime = TFrom - To_array
-#        l_prime = TTo - To_array    # Markus
-        dx = -np.linalg.inv(A.transpose() @ A) @ A.transpose() @ l_prime
-        x += dx
-#        pretty_print(x)
-        vI = A @ dx + l_prime
-        TFrom = Build_TFrom(x, From, identicals)
-        vII = TFrom - To_array
-        v = vI-vII
-        metric = max(abs(v))
-        counter += 1
-        A = Build_A(x, From, identicals)
-    if counter == max_iter:
-        print("Too many iterations")
+    cov = None
+    if weighted:
+        cov = Identical_covariances(From, To, identicals, x0)
+    iterations = solver
+    if solver == "closed_form":
+        iterations = "gauss_newton"
+        max_iter = 0
+    elif solver == "levenberg_marquardt":
+        max_iter = None
+    trace = []
+    def record(entry):
+        trace.append(entry)
+        if callback is not None:
+            callback(entry)
+    x, counter, status, *stats = Helmert_adjustment(
+        x0, From_array, To_array, cov=cov, solver=iterations,
+        max_iter=max_iter, threshold=threshold, callback=record,
+        centered=centered, return_stats=return_stats)
+    if solver == "closed_form":
+        status = CLOSED_FORM
 #    Transformed_From = Transformation(x,From)
-    Trans_par = np.array([x[0], x[1], x[2], x[3],
-                          a(x[4], a.T_RAD, True).angle,
-                          a(x[5], a.T_RAD, True).angle,
-                          a(x[6], a.T_RAD, True).angle])
-    return Trans_par
+    Trans_par = Normalized_parameters(x)
+    result = Trans_par
+    if return_stats:
+        stats = stats[0]
+        stats['identicals'] = identicals
+        stats['iterations'] = counter
+        stats['trace'] = trace
+        stats['status'] = status
+        stats['message'] = STATUS_MESSAGES[status]
+        result = (Trans_par, stats)
+    if cache is not None and status != MAX_ITERATIONS:
+        # Only converged parameters are reused as starting values
+        cache.store(key, fingerprint, x, result)
+    return result
 
 
 def pretty_print(x):
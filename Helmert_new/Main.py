@@ -6,8 +6,11 @@ Created on Fri Oct 13 17:19:29 2023
 """
 
 import os
+from .pointset import PointSet
 
-def read_text_file(file_path):
+def read_text_file(file_path, as_pointset=False):
+    """Reads 'name x y z' lines into {file_name: {name: (x, y, z)}},
+    or into {file_name: PointSet} when as_pointset is True"""
     data_dict = {}
     
     # Extract the file name (without extension) from the file path
@@ -23,10 +26,13 @@ def read_text_file(file_path):
                 z = float(parts[3])
                 data_dict[point_name] = (x, y, z)
     
+    if as_pointset:
+        return {file_name: PointSet.from_dict(data_dict)}
     return {file_name: data_dict}
 
-# Replace 'your_data.txt' with the path to your text file
-file_path = 'your_data.txt'
+if __name__ == "__main__":
+    # Replace 'your_data.txt' with the path to your text file
+    file_path = 'your_data.txt'
 
-resulting_dict = read_text_file(file_path)
-print(resulting_dict)
+    resulting_dict = read_text_file(file_path)
+    print(resulting_dict)
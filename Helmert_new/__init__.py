@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:05:18 2026
+
+Helmert transformation library.
+
+The submodules are imported on first use of one of their names (PEP 562
+module __getattr__), so `import Helmert_new` itself loads nothing and a
+pure transformation workload only pays for Helmert3Dtransform and numpy:
+
+    import Helmert_new as hn
+    x = hn.Helmert_transform(From, To)
+    hn.Transformation(x, points)
+"""
+
+import importlib
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    'Helmert_transform': 'Helmert3Dtransform',
+    'Transformation': 'Helmert3Dtransform',
+    'Transform_array': 'Helmert3Dtransform',
+    'HelmertKey': 'Helmert3Dtransform',
+    'as_key': 'Helmert3Dtransform',
+    'Rotation_matrix': 'Helmert3Dtransform',
+    'Rotation_angles': 'Helmert3Dtransform',
+    'Forward_model': 'Helmert3Dtransform',
+    'Jacobian': 'Helmert3Dtransform',
+    'Closed_form_parameters': 'Helmert3Dtransform',
+    'Helmert_aproximate_parameters': 'Helmert3Dtransform',
+    'Helmert_iterations': 'Helmert3Dtransform',
+    'Levenberg_marquardt_iterations': 'Helmert3Dtransform',
+    'Helmert_statistics': 'Helmert3Dtransform',
+    'Helmert_adjustment': 'Helmert3Dtransform',
+    'Propagate_covariance': 'Helmert3Dtransform',
+    'Normalized_parameters': 'Helmert3Dtransform',
+    'Centroids': 'Helmert3Dtransform',
+    'Reduced_coordinates': 'Helmert3Dtransform',
+    'Centered_parameters': 'Helmert3Dtransform',
+    'Uncentered_parameters': 'Helmert3Dtransform',
+    'STATUS_MESSAGES': 'Helmert3Dtransform',
+    'PointSet': 'pointset',
+    'as_pointset': 'pointset',
+    'Identical_points': 'pointset',
+    'Angle': 'angle',
+    'read_text_file': 'Main',
+    'Helmert_transform_batch': 'batch',
+    'Transform_file': 'streaming',
+    'Helmert_transform_streaming': 'streaming',
+    'Helmert_transform_robust': 'robust',
+    'Leave_one_out': 'diagnostics',
+    'HelmertCache': 'cache',
+    'HelmertEstimator': 'incremental',
+    'Register_stations': 'registration',
+    'FrameGraph': 'frames',
+    'Estimate_transformation': 'models',
+    'Get_model': 'models',
+    'MODELS': 'models',
+    'HelmertService': 'service',
+}
+_SUBMODULES = set(_EXPORTS.values())
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    if name not in _EXPORTS:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
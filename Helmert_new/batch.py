@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:05:33 2026
+
+Batched estimation of many independent Helmert transformations.
+All B problems are solved together with stacked linear algebra.
+"""
+
+import numpy as np
+from .Helmert3Dtransform import (Closed_form_parameters, Reduced_coordinates,
+                                 Uncentered_parameters)
+
+
+def _Stacked_rotations(angles):
+    """Rotation matrices Rx, Ry, Rz and their derivatives for (B,3) angles,
+    each returned as a (B,3,3) stack (same convention as X_Rotation...)"""
+    c = np.cos(angles)
+    s = np.sin(angles)
+    o = np.ones(len(angles))
+    z = np.zeros(len(angles))
+    def stack(*elements):
+        return np.stack(elements, axis=-1).reshape(-1, 3, 3)
+    RX  = stack(o, z, z, z, c[:, 0], s[:, 0], z, -s[:, 0], c[:, 0])
+    RY  = stack(c[:, 1], z, s[:, 1], z, o, z, -s[:, 1], z, c[:, 1])
+    RZ  = stack(c[:, 2], s[:, 2], z, -s[:, 2], c[:, 2], z, z, z, o)
+    dRX = stack(z, z, z, z, -s[:, 0], c[:, 0], z, -c[:, 0], -s[:, 0])
+    dRY = stack(-s[:, 1], z, c[:, 1], z, z, z, -c[:, 1], z, -s[:, 1])
+    dRZ = stack(-s[:, 2], c[:, 2], z, -c[:, 2], -s[:, 2], z, z, z, z)
+    return RX, RY, RZ, dRX, dRY, dRZ
+
+
+def Forward_model_batch(x, From):
+    """T + q * R @ X for (B,7) parameters and (B,N,3) points"""
+    RX, RY, RZ = _Stacked_rotations(x[:, 4:7])[:3]
+    M = x[:, 3, None, None] * (RX @ RY @ RZ)
+    return np.einsum('bij,bnj->bni', M, From) + x[:, None, 0:3]
+
+
+def Jacobian_batch(x, From):
+    """Design matrices (B,3N,7) for (B,7) parameters and (B,N,3) points"""
+    RX, RY, RZ, dRX, dRY, dRZ = _Stacked_rotations(x[:, 4:7])
+    q = x[:, 3, None, None]
+    dM = np.stack((RX @ RY @ RZ,
+                   q * dRX @ RY @ RZ,
+                   q * RX @ dRY @ RZ,
+                   q * RX @ RY @ dRZ), axis=1)
+    A = np.zeros(From.shape[:2] + (3, 7))
+    A[:, :, [0, 1, 2], [0, 1, 2]] = 1
+    A[:, :, :, 3:] = np.einsum('bkij,bnj->bnik', dM, From)
+    return A.reshape(len(From), -1, 7)
+
+
+def Stack_ragged(point_arrays):
+    """Pads a list of (Ni,d) arrays to one (B,N,d) array.
+    Returns the stacked array and the (B,N) mask of real points"""
+    sizes = [len(points) for points in point_arrays]
+    dimension = np.shape(point_arrays[0])[-1]
+    stacked = np.zeros((len(point_arrays), max(sizes), dimension))
+    mask = np.zeros((len(point_arrays), max(sizes)), dtype=bool)
+    for b, points in enumerate(point_arrays):
+        stacked[b, :sizes[b]] = points
+        mask[b, :sizes[b]] = True
+    return stacked, mask
+
+
+def Helmert_transform_batch(From, To, mask=None, max_iter=10,
+                            threshold=0.0000000001, model=None,
+                            centered=True):
+    """
+    Estimate B independent Helmert transformations at once.
+
+    Parameters
+    ----------
+    From : np.ndarray or list
+        Original points of identical pairs, (B,N,3) array or a
+        list of B (Ni,3) arrays of different lengths.
+    To : np.ndarray or list
+        Target points in the same layout as From, row i of
+        From[b] corresponds to row i of To[b].
+    mask : np.ndarray, optional
+        (B,N) boolean array of points taking part in each fit,
+        built automatically for ragged lists.
+    max_iter : int, optional
+        Maximum number of Gauss-Newton iterations.
+    threshold : float, optional
+        Convergence threshold on the linearization error, the
+        same criterion as Helmert_transform.
+    model : TransformationModel, optional
+        Other transformation model from models.py, by default
+        the 7-parameter Helmert transformation.
+    centered : bool, optional
+        Solve every problem reduced to the centroids of its
+        masked points (default) and convert the parameters
+        back, see Reduced_coordinates.
+
+    Returns
+    -------
+    Trans_par : np.ndarray
+        (B,7) transformation parameters [dx, dy, dz, scale,
+        rx, ry, rz] with angles in radians in [-pi, pi), or
+        (B,p) parameters of the given model.
+    converged : np.ndarray
+        (B,) boolean flags, False where the iterations did not
+        reach the threshold within max_iter.
+
+    Note
+    ----
+    - Starting values come from the closed-form solution of
+      each batch, so all fits share one O(N) pass.
+    - Each batch needs at least three non-collinear points.
+    """
+    if isinstance(From, (list, tuple)):
+        From, ragged_mask = Stack_ragged(From)
+        To, _ = Stack_ragged(To)
+        if mask is None:
+            mask = ragged_mask
+    From = np.asarray(From, dtype=float)
+    To = np.asarray(To, dtype=float)
+    if mask is None:
+        mask = np.ones(From.shape[:2], dtype=bool)
+    mask = np.asarray(mask, dtype=bool)
+    if model is None:
+        forward = Forward_model_batch
+        jacobian = Jacobian_batch
+        initial = Closed_form_parameters
+        minimum_points = 3
+    else:
+        forward = model.forward_batch
+        jacobian = model.jacobian_batch
+        initial = model.initial_batch
+        minimum_points = model.minimum_points
+    if np.any(mask.sum(axis=1) < minimum_points):
+        raise ValueError("Each batch needs at least {} identical "
+                         "points".format(minimum_points))
+    if centered:
+        From, To, From_centroid, To_centroid = Reduced_coordinates(
+            From, To, mask.astype(float))
+    # weight per equation
+    w = np.repeat(mask.astype(float), From.shape[-1], axis=1)
+    x = initial(From, To, mask.astype(float))
+    To_flat = To.reshape(len(To), -1)
+    TFrom = forward(x, From).reshape(len(From), -1)
+    A = jacobian(x, From)
+    active = np.ones(len(From), dtype=bool)
+    counter = 0
+    while active.any() and counter < max_iter:
+        l_prime = (TFrom - To_flat) * w
+        Aw = A * w[:, :, None]
+        N = np.einsum('bmi,bmj->bij', Aw, A)
+        n = np.einsum('bmi,bm->bi', Aw, l_prime)
+        dx = -np.linalg.solve(N, n[..., None])[..., 0]
+        dx[~active] = 0
+        x += dx
+        # Padded rows are masked in both linearizations
+        vI = np.einsum('bmi,bi->bm', A, dx) * w + l_prime
+        TFrom = forward(x, From).reshape(len(From), -1)
+        vII = (TFrom - To_flat) * w
+        metric = np.abs(vI - vII).max(axis=1)
+        active &= metric > threshold
+        counter += 1
+        A = jacobian(x, From)
+    if centered:
+        x = Uncentered_parameters(x, From_centroid, To_centroid, model)
+    if model is None:
+        x[:, 4:7] = (x[:, 4:7] + np.pi) % (2 * np.pi) - np.pi
+    else:
+        x = model.normalized(x)
+    return x, ~active
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:40:12 2026
+
+Warm-start cache of converged Helmert transformations, for jobs that
+rerun the estimation on (almost) the same identical points.
+"""
+
+import copy
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class HelmertCache():
+    """LRU cache of converged transformations.
+
+    Entries are keyed on the identical point IDs (plus the estimation
+    options) and remember a fingerprint of the coordinates they were
+    computed from. Unchanged inputs return the stored result outright,
+    changed coordinates of the same points reuse the stored parameters as
+    starting values. The least recently used entry is evicted once more
+    than maxsize entries are stored.
+    """
+
+    def __init__(self, maxsize=128):
+        if maxsize < 1:
+            raise ValueError("maxsize has to be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.warm_starts = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    @staticmethod
+    def make_key(identicals, options=()):
+        """Key of a set of identical point IDs and estimation options"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(tuple(options)).encode())
+        for name in identicals:
+            digest.update(str(name).encode() + b'\0')
+        return digest.hexdigest()
+
+    @staticmethod
+    def fingerprint(*arrays):
+        """Fingerprint of the coordinate (and covariance) arrays"""
+        digest = hashlib.blake2b(digest_size=16)
+        for array in arrays:
+            if array is not None:
+                digest.update(np.ascontiguousarray(array,
+                                                   dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def lookup(self, key, fingerprint):
+        """Returns (result, x0): the stored result when the fingerprint
+        matches, otherwise the stored parameters as starting values, or
+        (None, None) when the key is unknown"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, None
+        self._entries.move_to_end(key)
+        stored_fingerprint, x, result = entry
+        if stored_fingerprint == fingerprint and result is not None:
+            self.hits += 1
+            return copy.deepcopy(result), None
+        self.warm_starts += 1
+        return None, x.copy()
+
+    def store(self, key, fingerprint, x, result):
+        """Stores the converged parameters x (internal parameter vector) and
+        the result returned to the caller. Callers only store converged
+        runs, the parameters are reused as starting values"""
+        self._entries[key] = (fingerprint, np.array(x, dtype=float),
+                              copy.deepcopy(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
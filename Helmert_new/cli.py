@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 08:36:52 2026
+
+Command-line batch transformation of point files.
+
+Transforms every 'name x y z ...' point file given (directories are
+searched for --pattern) with stored parameters or with parameters
+estimated from a pair of point files. Files are processed concurrently
+on a process pool and streamed chunk by chunk (see Transform_file), and
+a per-file timing and throughput summary is printed at the end:
+
+    python -m Helmert_new.cli data/ -o out/ --params dx dy dz s rx ry rz
+    python -m Helmert_new.cli data/ -o out/ --estimate From.txt To.txt
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from .Helmert3Dtransform import Helmert_transform
+from .Main import read_text_file
+from .streaming import Transform_file
+
+
+def Input_files(paths, pattern='*.txt'):
+    """Point files of the given files and directories (searched for
+    pattern, not recursively), largest first so the pool stays busy"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, pattern)))
+        else:
+            files.append(path)
+    return sorted(dict.fromkeys(files), key=os.path.getsize, reverse=True)
+
+
+def Read_parameters(file_path):
+    """Seven parameters [dx, dy, dz, scale, rx, ry, rz] from a JSON file
+    (a list, or an object with 'parameters') or a whitespace separated
+    text file"""
+    with open(file_path, 'r') as file:
+        text = file.read()
+    try:
+        parameters = json.loads(text)
+        if isinstance(parameters, dict):
+            parameters = parameters['parameters']
+    except ValueError:
+        parameters = text.replace(',', ' ').split()
+    parameters = np.asarray(parameters, dtype=float).ravel()
+    if len(parameters) != 7:
+        raise ValueError("{} does not hold seven transformation "
+                         "parameters".format(file_path))
+    return parameters
+
+
+def Estimate_parameters(From_path, To_path):
+    """Helmert_transform of two point files, returns (parameters, stats)"""
+    From = next(iter(read_text_file(From_path, as_pointset=True).values()))
+    To = next(iter(read_text_file(To_path, as_pointset=True).values()))
+    return Helmert_transform(From, To, return_stats=True)
+
+
+def _Transform_task(args):
+    """Transform_file in a pool worker, errors are returned as text"""
+    x, input_path, output_path, chunk_size, precision = args
+    try:
+        return Transform_file(x, input_path, output_path,
+                              chunk_size=chunk_size, precision=precision)
+    except (OSError, ValueError) as error:
+        return {'error': str(error)}
+
+
+def Transform_files(x, input_files, output_dir, workers=None,
+                    chunk_size=100000, precision=6):
+    """
+    Transform point files concurrently.
+
+    Parameters
+    ----------
+    x : array_like
+        Transformation parameters [dx, dy, dz, scale, rx, ry, rz].
+    input_files : list
+        Point files, each written to output_dir under its own
+        file name.
+    output_dir : str
+        Directory of the transformed files, created if needed.
+    workers : int, optional
+        Number of processes, default all cores.
+    chunk_size : int, optional
+        Lines held in memory per file and process.
+    precision : int, optional
+        Number of decimals of the written coordinates.
+
+    Returns
+    -------
+    dict
+        {input_path: stats of Transform_file, or {'error': message}}
+        in the order of input_files.
+    """
+    output_files = [os.path.join(output_dir, os.path.basename(path))
+                    for path in input_files]
+    if len(set(output_files)) < len(output_files):
+        raise ValueError("Input files with the same name would overwrite "
+                         "each other in {}".format(output_dir))
+    if any(os.path.abspath(path) == os.path.abspath(output)
+           for path, output in zip(input_files, output_files)):
+        raise ValueError("The output directory must not hold the inputs")
+    os.makedirs(output_dir, exist_ok=True)
+    x = np.asarray(x, dtype=float)
+    tasks = [(x, path, output, chunk_size, precision)
+             for path, output in zip(input_files, output_files)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(_Transform_task, task): task[1]
+                   for task in tasks}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return {path: results[path] for path in input_files}
+
+
+def Print_summary(results, seconds):
+    """Per-file table and totals of Transform_files results"""
+    width = max([len(path) for path in results] + [4])
+    print("{:{w}s} {:>12s} {:>10s} {:>14s}".format(
+        "File", "Points", "Seconds", "Points/s", w=width))
+    points = 0
+    for path, stats in results.items():
+        if 'error' in stats:
+            print("{:{w}s} FAILED: {}".format(path, stats['error'], w=width))
+            continue
+        points += stats['points']
+        print("{:{w}s} {:>12d} {:>10.3f} {:>14.0f}".format(
+            path, stats['points'], stats['seconds'],
+            stats['points_per_second'], w=width))
+    print("{} files, {} points in {:.3f} s ({:.0f} points/s)".format(
+        len(results), points, seconds, points / seconds if seconds else 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('inputs', nargs='+',
+                        help='point files or directories of them')
+    parser.add_argument('-o', '--output-dir', required=True,
+                        help='directory of the transformed files')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--params', nargs=7, type=float,
+                        metavar=('DX', 'DY', 'DZ', 'SCALE', 'RX', 'RY', 'RZ'),
+                        help='transformation parameters, angles in radians')
+    source.add_argument('--params-file',
+                        help='JSON or text file with the seven parameters')
+    source.add_argument('--estimate', nargs=2, metavar=('FROM', 'TO'),
+                        help='estimate the parameters from two point files')
+    parser.add_argument('--save-params',
+                        help='write the parameters used to this JSON file')
+    parser.add_argument('--pattern', default='*.txt',
+                        help='file pattern searched in input directories')
+    parser.add_argument('-j', '--workers', type=int,
+                        help='number of processes, default all cores')
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help='lines held in memory per file')
+    parser.add_argument('--precision', type=int, default=6,
+                        help='decimals of the written coordinates')
+    args = parser.parse_args(argv)
+    paths = list(args.inputs) + list(args.estimate or [])
+    if args.params_file is not None:
+        paths.append(args.params_file)
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        parser.error("no such file or directory: {}".format(
+            ", ".join(missing)))
+
+    if args.params is not None:
+        x = np.array(args.params)
+    elif args.params_file is not None:
+        x = Read_parameters(args.params_file)
+    else:
+        x, stats = Estimate_parameters(*args.estimate)
+        print("Estimated from {} identical points, sigma0 = {:.6f}, "
+              "{}".format(len(stats['identicals']),
+                          np.sqrt(stats['sigma0_squared']),
+                          stats['message']))
+    if args.save_params:
+        with open(args.save_params, 'w') as file:
+            json.dump({'parameters': x.tolist()}, file, indent=1)
+
+    input_files = Input_files(args.inputs, args.pattern)
+    if not input_files:
+        parser.error("no point files found")
+    start = time.perf_counter()
+    try:
+        results = Transform_files(x, input_files, args.output_dir,
+                                  args.workers, args.chunk_size,
+                                  args.precision)
+    except ValueError as error:
+        parser.error(str(error))
+    Print_summary(results, time.perf_counter() - start)
+    return 1 if any('error' in stats for stats in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
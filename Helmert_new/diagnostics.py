@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:22:05 2026
+
+Leave-one-out diagnostics of the identical points of a Helmert
+transformation.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from .Helmert3Dtransform import (Forward_model, Jacobian, Helmert_adjustment,
+                                 Closed_form_parameters, Reduced_coordinates,
+                                 Centered_parameters, Uncentered_parameters)
+from .batch import Forward_model_batch
+from .pointset import Identical_points
+
+
+def _Leave_one_out_solve(args):
+    """Full Gauss-Newton solve without point i (process pool worker)"""
+    x, From_array, To_array, i = args
+    weights = np.ones(len(From_array))
+    weights[i] = 0
+    return Helmert_adjustment(x, From_array, To_array, weights)[0]
+
+
+def Leave_one_out(From, To, exact=False, workers=None):
+    """
+    Leave-one-out predictions of every identical point.
+
+    For each identical point the transformation is solved
+    without it and the point is predicted from that solution.
+    By default the N solutions come from rank-3 downdates of
+    the shared normal matrix at the full solution, solved
+    together as one (N,7,7) stack - a single Gauss-Newton
+    step from the full solution, which is exact up to the
+    linearization. exact=True instead runs N full iterative
+    solves on a process pool. The downdates are made in
+    coordinates reduced to the centroids of all identical
+    points (see Reduced_coordinates).
+
+    Parameters
+    ----------
+    From : PointSet or dict
+        Original points.
+    To : PointSet or dict
+        Target points, joined with From by point name.
+    exact : bool, optional
+        Iterate every solution to convergence on a process pool.
+    workers : int, optional
+        Number of processes for exact=True, default all cores.
+
+    Returns
+    -------
+    dict
+        Table of per-point columns:
+        'identicals' - point names,
+        'prediction_error' - (N,3) To minus the point predicted
+        without itself,
+        'error_norm' - (N,) length of the prediction error,
+        'residuals' - (N,3) residuals of the full solution,
+        'parameter_change' - (N,7) parameters without the point
+        minus the full solution,
+        'x' - full-solution parameters.
+    """
+    identicals, From_array, To_array = Identical_points(From, To)
+    if len(identicals) < 4:
+        raise ValueError("Leave-one-out needs at least four identical points")
+    x0 = Closed_form_parameters(From_array, To_array)
+    x = Helmert_adjustment(x0, From_array, To_array)[0]
+    if exact:
+        tasks = [(x, From_array, To_array, i) for i in range(len(identicals))]
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            x_loo = np.array(list(pool.map(_Leave_one_out_solve, tasks)))
+    else:
+        From_reduced, To_reduced, From_centroid, To_centroid = \
+            Reduced_coordinates(From_array, To_array)
+        x_reduced = Centered_parameters(x, From_centroid, To_centroid)
+        A = Jacobian(x_reduced, From_reduced)
+        l_prime = (Forward_model(x_reduced, From_reduced) -
+                   To_reduced).ravel()
+        N = A.T @ A
+        n = A.T @ l_prime
+        # Contributions of each point, (N,7,7) and (N,7)
+        A_i = A.reshape(-1, 3, 7)
+        N_i = np.einsum('nki,nkj->nij', A_i, A_i)
+        n_i = np.einsum('nki,nk->ni', A_i, l_prime.reshape(-1, 3))
+        dx = -np.linalg.solve(N - N_i, (n - n_i)[..., None])[..., 0]
+        x_loo = Uncentered_parameters(x_reduced + dx, From_centroid,
+                                      To_centroid)
+    # Prediction of each left-out point with its own solution
+    predicted = Forward_model_batch(x_loo, From_array[:, None, :])[:, 0]
+    prediction_error = To_array - predicted
+    return {'identicals': identicals,
+            'prediction_error': prediction_error,
+            'error_norm': np.linalg.norm(prediction_error, axis=1),
+            'residuals': To_array - Forward_model(x, From_array),
+            'parameter_change': x_loo - x,
+            'x': x}
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:02:44 2026
+
+Registry of named coordinate frames connected by Helmert transformations,
+with chains between any two frames composed into one cached Key.
+"""
+
+from collections import deque
+
+from .Helmert3Dtransform import HelmertKey, as_key, Transformation
+
+IDENTITY = (0, 0, 0, 1, 0, 0, 0)
+
+
+class FrameGraph():
+    """Named frames as nodes, transformations between them as edges.
+
+    Every transformation added is usable in both directions (the reverse
+    edge holds its inverse Key). key(source, target) finds the path with
+    the fewest hops, composes it into a single HelmertKey (one 4x4
+    matrix, see HelmertKey.matrix) and caches it, so transform() maps
+    points across any number of frames in one vectorized pass instead of
+    one pass per hop. Adding or removing a transformation clears the cache.
+
+        frames = FrameGraph()
+        frames.add_transform('instrument', 'grid', x1)
+        frames.add_transform('grid', 'project', x2)
+        frames.add_transform('ECEF', 'project', x3)
+        points_ECEF = frames.transform(points, 'instrument', 'ECEF')
+    """
+
+    def __init__(self):
+        self._edges = {}
+        self._cache = {}
+
+    def __contains__(self, frame):
+        return frame in self._edges
+
+    def __len__(self):
+        return len(self._edges)
+
+    @property
+    def frames(self):
+        return list(self._edges)
+
+    def add_frame(self, frame):
+        """Registers a frame without transformations yet"""
+        self._edges.setdefault(frame, {})
+
+    def add_transform(self, source, target, x):
+        """Adds (or replaces) the transformation from source to target,
+        x being a HelmertKey or [dx, dy, dz, scale, rx, ry, rz] as
+        returned by Helmert_transform(source points, target points)"""
+        if source == target:
+            raise ValueError("Source and target frame are the same")
+        key = as_key(x)
+        self.add_frame(source)
+        self.add_frame(target)
+        self._edges[source][target] = key
+        self._edges[target][source] = key.inverse
+        self._cache.clear()
+
+    def remove_transform(self, source, target):
+        """Removes the transformation between source and target"""
+        del self._edges[source][target]
+        del self._edges[target][source]
+        self._cache.clear()
+
+    def path(self, source, target):
+        """Frames on the path with the fewest hops from source to target
+        (breadth-first search), both included"""
+        for frame in (source, target):
+            if frame not in self._edges:
+                raise KeyError("Unknown frame: {}".format(frame))
+        previous = {source: None}
+        queue = deque([source])
+        while queue and target not in previous:
+            frame = queue.popleft()
+            for neighbour in self._edges[frame]:
+                if neighbour not in previous:
+                    previous[neighbour] = frame
+                    queue.append(neighbour)
+        if target not in previous:
+            raise ValueError("No transformations lead from {} to {}".format(
+                source, target))
+        path = [target]
+        while path[-1] != source:
+            path.append(previous[path[-1]])
+        return path[::-1]
+
+    def key(self, source, target):
+        """Composed HelmertKey from source to target (cached, the reverse
+        direction is cached along with it)"""
+        key = self._cache.get((source, target))
+        if key is None:
+            path = self.path(source, target)
+            key = HelmertKey(IDENTITY)
+            for start, end in zip(path[:-1], path[1:]):
+                key = key.then(self._edges[start][end])
+            self._cache[(source, target)] = key
+            self._cache[(target, source)] = key.inverse
+        return key
+
+    def matrix(self, source, target):
+        """4x4 homogeneous matrix from source to target"""
+        return self.key(source, target).matrix
+
+    def transform(self, points, source, target, out=None, workers=None):
+        """Transforms points (PointSet, dict or (N,3) array) from source to
+        target in one pass, see Transformation for out and workers"""
+        return Transformation(self.key(source, target), points, out=out,
+                              workers=workers)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:55:47 2026
+
+Stateful Helmert estimator with low-rank updates of the normal equations
+for adding, removing and re-measuring single identical points.
+"""
+
+import numpy as np
+from .Helmert3Dtransform import (Forward_model, Jacobian,
+                                 Closed_form_parameters, Helmert_adjustment,
+                                 Normalized_parameters, Centroids,
+                                 Centered_parameters, Uncentered_parameters)
+from .pointset import Identical_points
+
+
+class HelmertEstimator():
+    """Keeps the normal equations N = A.T @ A and n = A.T @ l' of the
+    identical points, linearized at x_lin.
+
+    Every edit adds or removes one point's 3x7 block (a rank-3 update of
+    N), so it costs O(1) whatever the number of points. The solution is
+    one Gauss-Newton step from x_lin; call relinearize() to iterate again
+    over all points (O(N)) once the solution has moved far from x_lin.
+
+    The normal equations are built from coordinates reduced by a fixed
+    offset (see Reduced_coordinates), the centroids of the initial points
+    or the first point added, which the edits leave unchanged. x_lin, N
+    and n refer to the reduced coordinates (see Centered_parameters),
+    parameters() to the original ones.
+    """
+
+    def __init__(self, From=None, To=None, x0=None):
+        self.x0 = None if x0 is None else np.array(x0, dtype=float)
+        self.x_lin = None
+        self.From_offset = None
+        self.To_offset = None
+        self.N = np.zeros((7, 7))
+        self.n = np.zeros(7)
+        self.points = {}
+        self._blocks = {}
+        if From is not None and To is not None:
+            identicals, From_array, To_array = Identical_points(From, To)
+            if len(identicals):
+                self._set_offsets(*Centroids(From_array, To_array))
+            for name, From_xyz, To_xyz in zip(identicals, From_array,
+                                              To_array):
+                self.points[name] = (From_xyz, To_xyz)
+            self.relinearize()
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, name):
+        return name in self.points
+
+    def _set_offsets(self, From_offset, To_offset):
+        """Fixes the reduction of the coordinates, x0 is reduced with it"""
+        self.From_offset = np.array(From_offset, dtype=float)
+        self.To_offset = np.array(To_offset, dtype=float)
+        if self.x0 is not None:
+            self.x_lin = Centered_parameters(self.x0, self.From_offset,
+                                             self.To_offset)
+
+    def _reduced(self, name):
+        From_xyz, To_xyz = self.points[name]
+        return From_xyz - self.From_offset, To_xyz - self.To_offset
+
+    def _add_block(self, name):
+        From_xyz, To_xyz = self._reduced(name)
+        A_i = Jacobian(self.x_lin, From_xyz)
+        l_i = Forward_model(self.x_lin, From_xyz)[0] - To_xyz
+        self.N += A_i.T @ A_i
+        self.n += A_i.T @ l_i
+        self._blocks[name] = (A_i, l_i)
+
+    def _remove_block(self, name):
+        A_i, l_i = self._blocks.pop(name)
+        self.N -= A_i.T @ A_i
+        self.n -= A_i.T @ l_i
+
+    def add_point(self, name, From_xyz, To_xyz):
+        """Adds an identical point (coordinates in both systems)"""
+        if name in self.points:
+            raise KeyError("Point {} is already used".format(name))
+        self.points[name] = (np.array(From_xyz[:3], dtype=float),
+                             np.array(To_xyz[:3], dtype=float))
+        if self.From_offset is None:
+            self._set_offsets(*self.points[name])
+        if self.x_lin is None:
+            if len(self.points) >= 3:
+                self.relinearize()
+        else:
+            self._add_block(name)
+
+    def remove_point(self, name):
+        """Removes an identical point"""
+        del self.points[name]
+        if name in self._blocks:
+            self._remove_block(name)
+
+    def update_point(self, name, From_xyz=None, To_xyz=None):
+        """Replaces the coordinates of a re-measured point"""
+        From_old, To_old = self.points[name]
+        self.remove_point(name)
+        self.add_point(name,
+                       From_old if From_xyz is None else From_xyz,
+                       To_old if To_xyz is None else To_xyz)
+
+    def relinearize(self, max_iter=10, threshold=0.0000000001):
+        """Iterates over all points and rebuilds the normal equations at
+        the converged parameters"""
+        if len(self.points) < 3:
+            raise ValueError("Not enough identical points for transformation "
+                             "calculations.")
+        From_array = np.array([From_xyz for From_xyz, To_xyz
+                               in self.points.values()])
+        To_array = np.array([To_xyz for From_xyz, To_xyz
+                             in self.points.values()])
+        if self.x_lin is None:
+            x0 = Closed_form_parameters(From_array, To_array)
+        else:
+            x0 = Uncentered_parameters(self.x_lin, self.From_offset,
+                                       self.To_offset)
+        x = Helmert_adjustment(x0, From_array, To_array, max_iter=max_iter,
+                               threshold=threshold)[0]
+        self.x_lin = Centered_parameters(x, self.From_offset, self.To_offset)
+        self.N = np.zeros((7, 7))
+        self.n = np.zeros(7)
+        self._blocks = {}
+        for name in self.points:
+            self._add_block(name)
+
+    def _reduced_solution(self):
+        if len(self.points) < 3:
+            raise ValueError("Not enough identical points for transformation "
+                             "calculations.")
+        return self.x_lin - np.linalg.solve(self.N, self.n)
+
+    def solution(self):
+        """Internal parameter vector x_lin - inv(N) @ n, converted to the
+        original coordinates"""
+        return Uncentered_parameters(self._reduced_solution(),
+                                     self.From_offset, self.To_offset)
+
+    def parameters(self):
+        """[dx, dy, dz, scale, rx, ry, rz] as Helmert_transform"""
+        return Normalized_parameters(self.solution())
+
+    def residuals(self):
+        """{name: To - transformed From} at the current solution"""
+        x = self._reduced_solution()
+        residuals = {}
+        for name in self.points:
+            From_xyz, To_xyz = self._reduced(name)
+            residuals[name] = To_xyz - Forward_model(x, From_xyz)[0]
+        return residuals
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:18:36 2026
+
+Transformation models sharing one vectorized estimation engine:
+Helmert_adjustment (weighted / covariance weighted), Helmert_transform_batch
+and Helmert_transform_streaming all accept any of these models.
+
+Each model declares its parameters and implements the forward model, the
+analytic Jacobian and closed-form starting values on stacks of point sets,
+x (B,p) and points (B,N,d); the single-set methods wrap them.
+"""
+
+import numpy as np
+from .Helmert3Dtransform import (Closed_form_parameters, Centroids,
+                                 Helmert_adjustment, STATUS_MESSAGES)
+from .batch import Forward_model_batch, Jacobian_batch, _Stacked_rotations
+from .pointset import Identical_points, as_pointset
+
+
+def _Wrap_angles(angles):
+    """Angles normalized to [-pi, pi)"""
+    return (angles + np.pi) % (2 * np.pi) - np.pi
+
+
+class TransformationModel():
+    """Base class of the transformation models.
+
+    Subclasses set name, parameters (names of the p parameters in the
+    order of the parameter vector), dimension (2 or 3), minimum_points and
+    angles (indices of angle parameters, normalized to [-pi, pi)), and
+    implement forward_batch, jacobian_batch and initial_batch.
+    """
+    name = None
+    parameters = ()
+    dimension = 3
+    minimum_points = 3
+    angles = ()
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(self.parameters))
+
+    def forward_batch(self, x, From):
+        """Transformed points (B,N,d) for parameters (B,p)"""
+        raise NotImplementedError
+
+    def jacobian_batch(self, x, From):
+        """Design matrices (B,dN,p), rows ordered X1,Y1,(Z1),X2,..."""
+        raise NotImplementedError
+
+    def initial_batch(self, From, To, weights=None):
+        """Closed-form starting parameters (B,p)"""
+        raise NotImplementedError
+
+    def forward(self, x, From_array):
+        From_array = np.asarray(From_array, dtype=float
+                                ).reshape(-1, self.dimension)
+        return self.forward_batch(np.asarray(x, dtype=float)[None],
+                                  From_array[None])[0]
+
+    def jacobian(self, x, From_array):
+        From_array = np.asarray(From_array, dtype=float
+                                ).reshape(-1, self.dimension)
+        return self.jacobian_batch(np.asarray(x, dtype=float)[None],
+                                   From_array[None])[0]
+
+    def initial(self, From_array, To_array, weights=None):
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)[None]
+        return self.initial_batch(np.asarray(From_array, dtype=float)[None],
+                                  np.asarray(To_array, dtype=float)[None],
+                                  weights)[0]
+
+    def normalized(self, x):
+        """Parameters with the angles normalized to [-pi, pi)"""
+        x = np.array(x, dtype=float)
+        if self.angles:
+            x[..., list(self.angles)] = _Wrap_angles(x[..., list(self.angles)])
+        return x
+
+
+class Helmert7(TransformationModel):
+    """3D similarity, To = T + q*R@From (the Helmert_transform model)"""
+    name = "helmert7"
+    parameters = ("dx", "dy", "dz", "scale", "rx", "ry", "rz")
+    angles = (4, 5, 6)
+
+    def forward_batch(self, x, From):
+        return Forward_model_batch(x, From)
+
+    def jacobian_batch(self, x, From):
+        return Jacobian_batch(x, From)
+
+    def initial_batch(self, From, To, weights=None):
+        return Closed_form_parameters(From, To, weights)
+
+
+class Rigid6(TransformationModel):
+    """3D rigid-body motion with fixed scale 1, To = T + R@From"""
+    name = "rigid6"
+    parameters = ("dx", "dy", "dz", "rx", "ry", "rz")
+    angles = (3, 4, 5)
+
+    @staticmethod
+    def _with_scale(x):
+        return np.insert(x, 3, 1.0, axis=-1)
+
+    def forward_batch(self, x, From):
+        return Forward_model_batch(self._with_scale(x), From)
+
+    def jacobian_batch(self, x, From):
+        return Jacobian_batch(self._with_scale(x), From)[..., [0, 1, 2, 4, 5, 6]]
+
+    def initial_batch(self, From, To, weights=None):
+        x = Closed_form_parameters(From, To, weights)
+        x[..., 3] = 1.0
+        # Translation of the centroids without the scale
+        mu_From, mu_To = Centroids(From, To, weights)
+        mu_From_rotated = Forward_model_batch(
+            np.concatenate((np.zeros((len(x), 3)), x[..., 3:]), axis=-1),
+            mu_From[:, None, :])[:, 0]
+        x[..., 0:3] = mu_To - mu_From_rotated
+        return np.delete(x, 3, axis=-1)
+
+
+class Helmert9(TransformationModel):
+    """3D transformation with one scale per axis,
+    To = T + R @ diag(sx, sy, sz) @ From"""
+    name = "helmert9"
+    parameters = ("dx", "dy", "dz", "sx", "sy", "sz", "rx", "ry", "rz")
+    angles = (6, 7, 8)
+
+    def forward_batch(self, x, From):
+        RX, RY, RZ = _Stacked_rotations(x[:, 6:9])[:3]
+        M = (RX @ RY @ RZ) * x[:, None, 3:6]
+        return np.einsum('bij,bnj->bni', M, From) + x[:, None, 0:3]
+
+    def jacobian_batch(self, x, From):
+        RX, RY, RZ, dRX, dRY, dRZ = _Stacked_rotations(x[:, 6:9])
+        R = RX @ RY @ RZ
+        S = x[:, None, 3:6]
+        dM = np.stack((dRX @ RY @ RZ * S,
+                       RX @ dRY @ RZ * S,
+                       RX @ RY @ dRZ * S), axis=1)
+        A = np.zeros(From.shape[:2] + (3, 9))
+        A[:, :, [0, 1, 2], [0, 1, 2]] = 1
+        # d/ds_k is column k of R times the k-th coordinate
+        A[:, :, :, 3:6] = R[:, None, :, :] * From[:, :, None, :]
+        A[:, :, :, 6:9] = np.einsum('bkij,bnj->bnik', dM, From)
+        return A.reshape(len(From), -1, 9)
+
+    def initial_batch(self, From, To, weights=None):
+        x = Closed_form_parameters(From, To, weights)
+        return np.concatenate((x[..., 0:3], np.repeat(x[..., 3:4], 3, axis=-1),
+                               x[..., 4:7]), axis=-1)
+
+
+class Affine12(TransformationModel):
+    """General 3D affine transformation, To = T + A@From, with the
+    parameters T and the rows of A"""
+    name = "affine12"
+    parameters = ("dx", "dy", "dz", "a11", "a12", "a13", "a21", "a22",
+                  "a23", "a31", "a32", "a33")
+    minimum_points = 4
+
+    def forward_batch(self, x, From):
+        A = x[:, 3:12].reshape(-1, 3, 3)
+        return np.einsum('bij,bnj->bni', A, From) + x[:, None, 0:3]
+
+    def jacobian_batch(self, x, From):
+        J = np.zeros(From.shape[:2] + (3, 12))
+        J[:, :, [0, 1, 2], [0, 1, 2]] = 1
+        for i in range(3):
+            J[:, :, i, 3 + 3 * i:6 + 3 * i] = From
+        return J.reshape(len(From), -1, 12)
+
+    def initial_batch(self, From, To, weights=None):
+        # The model is linear, weighted least squares of [From 1] per batch
+        if weights is None:
+            weights = np.ones(From.shape[:-1])
+        G = np.concatenate((From, np.ones(From.shape[:-1] + (1,))), axis=-1)
+        Gw = G * weights[..., None]
+        beta = np.linalg.solve(np.einsum('bni,bnj->bij', Gw, G),
+                               np.einsum('bni,bnj->bij', Gw, To))
+        return np.concatenate((beta[:, 3, :],
+                               beta[:, 0:3, :].transpose(0, 2, 1
+                                                         ).reshape(-1, 9)),
+                              axis=-1)
+
+
+class Helmert2D(TransformationModel):
+    """2D similarity (4 parameters) for plans,
+    x' = dx + q*(cos(r)*x + sin(r)*y), y' = dy + q*(-sin(r)*x + cos(r)*y),
+    the rotation sense of Z_Rotation"""
+    name = "helmert2d"
+    parameters = ("dx", "dy", "scale", "rz")
+    dimension = 2
+    minimum_points = 2
+    angles = (3,)
+
+    def forward_batch(self, x, From):
+        c = x[:, 2, None] * np.cos(x[:, 3, None])
+        s = x[:, 2, None] * np.sin(x[:, 3, None])
+        return np.stack((x[:, 0, None] + c * From[..., 0] + s * From[..., 1],
+                         x[:, 1, None] - s * From[..., 0] + c * From[..., 1]),
+                        axis=-1)
+
+    def jacobian_batch(self, x, From):
+        c = np.cos(x[:, 3, None])
+        s = np.sin(x[:, 3, None])
+        q = x[:, 2, None]
+        X = From[..., 0]
+        Y = From[..., 1]
+        J = np.zeros(From.shape[:2] + (2, 4))
+        J[:, :, 0, 0] = 1
+        J[:, :, 1, 1] = 1
+        J[:, :, 0, 2] = c * X + s * Y
+        J[:, :, 1, 2] = -s * X + c * Y
+        J[:, :, 0, 3] = q * (-s * X + c * Y)
+        J[:, :, 1, 3] = q * (-c * X - s * Y)
+        return J.reshape(len(From), -1, 4)
+
+    def initial_batch(self, From, To, weights=None):
+        # Closed form with complex numbers: z' = t + q*exp(-i*r)*z
+        mu_From, mu_To = Centroids(From, To, weights)
+        if weights is None:
+            weights = np.ones(From.shape[:-1])
+        z_From = (From - mu_From[:, None, :]) @ np.array([1, 1j])
+        z_To = (To - mu_To[:, None, :]) @ np.array([1, 1j])
+        ratio = (np.einsum('bn,bn->b', weights, z_To * z_From.conj()) /
+                 np.einsum('bn,bn->b', weights, np.abs(z_From)**2))
+        q = np.abs(ratio)
+        r = -np.angle(ratio)
+        x = np.stack((np.zeros_like(q), np.zeros_like(q), q, r), axis=-1)
+        x[:, 0:2] = mu_To - self.forward_batch(x, mu_From[:, None, :])[:, 0]
+        return x
+
+
+MODELS = {model.name: model for model in
+          (Helmert7(), Rigid6(), Helmert9(), Affine12(), Helmert2D())}
+
+
+def Get_model(model):
+    """Model instance from a model or its name"""
+    if isinstance(model, TransformationModel):
+        return model
+    try:
+        return MODELS[model]
+    except KeyError:
+        raise ValueError("Unknown model: {}, use one of {}".format(
+            model, ", ".join(MODELS)))
+
+
+def Model_covariances(model, From, To, identicals, x):
+    """(N,d,d) covariances of To - f(x, From) for the identical points, from
+    the covariances carried by the PointSets: To.cov plus From.cov mapped
+    into the To frame with the linear part of the model at x (see
+    Identical_covariances), 2D models use the x/y blocks"""
+    From = as_pointset(From)
+    To = as_pointset(To)
+    if From.cov is None and To.cov is None:
+        raise ValueError("Weighted estimation needs PointSets with covariance")
+    d = model.dimension
+    cov = np.zeros((len(identicals), d, d))
+    if To.cov is not None:
+        cov += To.cov[[To.index[name] for name in identicals]][:, :d, :d]
+    if From.cov is not None:
+        # Columns of the linear part are the images of the unit vectors
+        M = (model.forward(x, np.eye(d)) - model.forward(x, np.zeros(d))).T
+        cov += M @ From.cov[[From.index[name] for name in identicals]
+                            ][:, :d, :d] @ M.T
+    return cov
+
+
+def Estimate_transformation(From, To, model="helmert7", weights=None,
+                            cov=None, weighted=False, return_stats=False,
+                            max_iter=10, threshold=0.0000000001,
+                            centered=True):
+    """
+    Estimate the parameters of any transformation model.
+
+    Parameters
+    ----------
+    From : PointSet or dict
+        Original points.
+    To : PointSet or dict
+        Target points, joined with From by point name.
+    model : str or TransformationModel, optional
+        "helmert7", "rigid6", "helmert9", "affine12" or
+        "helmert2d" (uses the x and y coordinates only).
+    weights : np.ndarray, optional
+        Per-point weights in the order of the joined identical
+        points (sorted point names).
+    cov : np.ndarray, optional
+        (N,d,d) covariance blocks of the coordinate differences
+        in the same order, applied by Cholesky whitening.
+    weighted : bool, optional
+        Take cov from the covariances of the PointSets instead,
+        see Model_covariances.
+    return_stats : bool, optional
+        Also return the accuracy, see Helmert_statistics.
+    max_iter : int, optional
+        Maximum number of Gauss-Newton iterations.
+    threshold : float, optional
+        Convergence threshold on the linearization error.
+    centered : bool, optional
+        Solve with the points reduced to their centroids
+        (default), see Helmert_adjustment.
+
+    Returns
+    -------
+    np.ndarray
+        Parameters in the order of model.parameters.
+    dict
+        Only with return_stats=True, Helmert_statistics plus
+        'identicals', 'iterations', 'status' (see
+        STATUS_MESSAGES) and 'message'.
+    """
+    model = Get_model(model)
+    identicals, From_array, To_array = Identical_points(From, To)
+    From_array = From_array[:, :model.dimension]
+    To_array = To_array[:, :model.dimension]
+    if len(identicals) < model.minimum_points:
+        raise ValueError("Not enough identical points for transformation "
+                         "calculations.")
+    x0 = model.initial(From_array, To_array, weights)
+    if weighted:
+        cov = Model_covariances(model, From, To, identicals, x0)
+    x, counter, status, *stats = Helmert_adjustment(
+        x0, From_array, To_array, weights=weights, cov=cov,
+        max_iter=max_iter, threshold=threshold, model=model,
+        centered=centered, return_stats=return_stats)
+    parameters = model.normalized(x)
+    if return_stats:
+        stats = stats[0]
+        stats['identicals'] = identicals
+        stats['iterations'] = counter
+        stats['status'] = status
+        stats['message'] = STATUS_MESSAGES[status]
+        return parameters, stats
+    return parameters
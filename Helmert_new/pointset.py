@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:12:41 2026
+
+Array-backed container for named 3D points.
+"""
+
+import numpy as np
+
+
+def _Names_array(names):
+    """1-D array of point IDs that keeps the callers' objects: a string
+    array when all IDs are strings, an object array otherwise (np.asarray
+    would turn e.g. the integer ID 1 into '1')"""
+    if isinstance(names, np.ndarray):
+        return names.reshape(-1)
+    names = list(names)
+    if all(isinstance(name, str) for name in names):
+        return np.array(names, dtype=str).reshape(-1)
+    array = np.empty(len(names), dtype=object)
+    for i, name in enumerate(names):
+        array[i] = name  # element-wise, tuple IDs are not broadcast
+    return array
+
+
+class PointSet():
+    """Named points stored as a contiguous (N,3) float64 array.
+
+    names  - point IDs (any hashable, e.g. str or int), in the order of
+             the rows of coords
+    coords - (N,3) array of coordinates
+    cov    - optional (N,3,3) array of covariance matrices
+
+    Behaves like the {name: (x, y, z)} dictionaries used across the library
+    (len, in, [name], keys(), items()), so it can be passed wherever such
+    a dictionary is expected.
+    """
+
+    def __init__(self, names, coords, cov=None):
+        self.names = _Names_array(names)
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64
+                                           ).reshape(-1, 3)
+        if len(self.names) != len(self.coords):
+            raise ValueError("Number of names and coordinates differ")
+        if cov is not None:
+            cov = np.ascontiguousarray(cov, dtype=np.float64
+                                       ).reshape(-1, 3, 3)
+            if len(cov) != len(self.coords):
+                raise ValueError("Number of covariances and coordinates differ")
+        self.cov = cov
+        self.index = {name: i for i, name in enumerate(self.names.tolist())}
+        if len(self.index) != len(self.names):
+            raise ValueError("Point names have to be unique")
+
+    @classmethod
+    def from_dict(cls, points):
+        """Builds a PointSet from {name: (x, y, z)} or from the
+        {name: {'coords': ..., 'cov_matrix': ...}} form of read_point_file"""
+        names = list(points.keys())
+        values = list(points.values())
+        if values and isinstance(values[0], dict):
+            coords = [value['coords'] for value in values]
+            cov = None
+            if all('cov_matrix' in value for value in values):
+                cov = [value['cov_matrix'] for value in values]
+            return cls(names, coords, cov)
+        coords = [tuple(value)[:3] for value in values]
+        return cls(names, np.array(coords, dtype=np.float64).reshape(-1, 3))
+
+    def to_dict(self):
+        """Returns the points as {name: (x, y, z)}"""
+        return dict(zip(self.names.tolist(), map(tuple, self.coords.tolist())))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names.tolist())
+
+    def __getitem__(self, name):
+        return tuple(self.coords[self.index[name]].tolist())
+
+    def __repr__(self):
+        return "PointSet({} points{})".format(
+            len(self), ", with covariance" if self.cov is not None else "")
+
+    def keys(self):
+        return self.index.keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def take(self, rows):
+        """New PointSet with the given rows (indices or boolean mask)"""
+        cov = None if self.cov is None else self.cov[rows]
+        return PointSet(self.names[rows], self.coords[rows], cov)
+
+    def join(self, other):
+        """Intersection by name with another PointSet.
+
+        Returns (names, rows_self, rows_other) with names sorted, so that
+        self.coords[rows_self] and other.coords[rows_other] are the
+        coordinates of the same points. Names of mixed types, which
+        cannot be sorted, keep the order of self."""
+        try:
+            names, rows_self, rows_other = np.intersect1d(
+                self.names, other.names, assume_unique=True,
+                return_indices=True)
+        except TypeError:
+            common = [name for name in self.index if name in other.index]
+            names = _Names_array(common)
+            rows_self = np.array([self.index[name] for name in common],
+                                 dtype=int)
+            rows_other = np.array([other.index[name] for name in common],
+                                  dtype=int)
+        return names, rows_self, rows_other
+
+
+def as_pointset(points):
+    """Returns points as a PointSet, converting dictionaries if needed"""
+    if isinstance(points, PointSet):
+        return points
+    return PointSet.from_dict(points)
+
+
+def Identical_points(From, To):
+    """Joins two point sets (PointSet or dict) by name.
+
+    Returns (identicals, From_array, To_array) where the arrays are the
+    (N,3) coordinates of the identical points in the order of identicals."""
+    From = as_pointset(From)
+    To = as_pointset(To)
+    identicals, rows_From, rows_To = From.join(To)
+    return (identicals.tolist(), From.coords[rows_From],
+            To.coords[rows_To])
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 09:18:27 2026
+
+Simultaneous registration of many instrument stations into one common
+frame, tied together by the targets they share.
+"""
+
+from collections import defaultdict, deque
+
+import numpy as np
+from .Helmert3Dtransform import (Closed_form_parameters, Forward_model,
+                                 Jacobian, Uncentered_parameters,
+                                 Normalized_parameters,
+                                 MAX_ITERATIONS, CONVERGED_STEP,
+                                 STATUS_MESSAGES)
+from .pointset import PointSet, as_pointset
+
+
+def _Initial_stations(station_points, local, control, fixed):
+    """Starting parameters (S,7) by registering the stations one after
+    another onto the points already known, breadth-first from the datum.
+    station_points are the point names of each station, local their
+    reduced coordinates, control {name: reduced global coordinates} and
+    fixed the index of the station defining the frame (or None).
+    Returns (x, registered, known) with registered the (S,) flags of the
+    stations reached and known the global coordinates of all points"""
+    x = np.zeros((len(station_points), 7))
+    known = {}
+    point_stations = defaultdict(list)
+    for s, names in enumerate(station_points):
+        for name in names:
+            point_stations[name].append(s)
+    known_count = np.zeros(len(station_points), dtype=int)
+    registered = np.zeros(len(station_points), dtype=bool)
+    queue = deque()
+    def add_known(name, coordinates):
+        known[name] = coordinates
+        for s in point_stations[name]:
+            known_count[s] += 1
+            if known_count[s] == 3 and not registered[s]:
+                queue.append(s)
+    for name in control:
+        add_known(name, control[name])
+    if fixed is not None:
+        # Its reduced coordinates are the reduced common frame
+        x[fixed] = (0, 0, 0, 1, 0, 0, 0)
+        queue.appendleft(fixed)
+    while queue:
+        s = queue.popleft()
+        if registered[s]:
+            continue
+        rows = [i for i, name in enumerate(station_points[s])
+                if name in known]
+        if s != fixed:
+            x[s] = Closed_form_parameters(
+                local[s][rows],
+                np.array([known[station_points[s][i]] for i in rows]))
+        registered[s] = True
+        transformed = Forward_model(x[s], local[s])
+        for name, coordinates in zip(station_points[s], transformed):
+            if name not in known:
+                add_known(name, coordinates)
+    return x, registered, known
+
+
+def Register_stations(stations, control=None, max_iter=50,
+                      threshold=0.0000000001):
+    """
+    Estimate the transformations of many stations into one frame at once.
+
+    Every station observes targets in its own coordinate system.
+    The 7 parameters of every station and the common-frame
+    coordinates of all targets are estimated together from
+    X_target = T + q * R @ x_station (residuals in the common
+    frame), so targets seen by several stations tie them
+    consistently. The normal matrix is block-sparse: 7x7 station
+    blocks, 3x3 target blocks and couplings only between a
+    station and its own targets. It is solved by a sparse LU
+    factorization (scipy.sparse, imported on first use), so the
+    cost grows linearly with the number of stations when each
+    station shares targets with a few others.
+
+    Parameters
+    ----------
+    stations : dict
+        {station name: points} with the points of each station
+        as a PointSet or {name: (x, y, z)} dictionary in the
+        station's own coordinate system.
+    control : PointSet or dict, optional
+        Known common-frame coordinates of control targets, they
+        define the datum and are kept fixed (at least three,
+        well spread). Without control the first station is held
+        fixed and defines the common frame.
+    max_iter : int, optional
+        Maximum number of Gauss-Newton iterations.
+    threshold : float, optional
+        Convergence threshold, the largest coordinate change
+        caused by an iteration step [m].
+
+    Returns
+    -------
+    dict
+        'stations' - {station name: [dx, dy, dz, scale, rx, ry,
+        rz]} into the common frame, as Helmert_transform,
+        'points' - PointSet of all targets in the common frame,
+        'residuals' - {station name: (n,3) array} common-frame
+        coordinates minus transformed station coordinates, in
+        the order of the station's points,
+        'sigma0_squared', 'redundancy', 'iterations', 'status'
+        and 'message' (see STATUS_MESSAGES).
+
+    Note
+    ----
+    - Every station needs at least three targets shared with
+      the stations registered before it (or with the control),
+      otherwise a ValueError names the station.
+    - All coordinates are reduced to centroids internally (the
+      stations to their own, the common frame to the control
+      or first station), see Helmert_transform.
+    """
+    import scipy.sparse as sparse
+    from scipy.sparse.linalg import splu
+
+    station_names = list(stations)
+    stations = [as_pointset(stations[name]) for name in station_names]
+    if len(stations) == 0:
+        raise ValueError("No stations given")
+    station_points = [points.names.tolist() for points in stations]
+    local_centroids = np.array([points.coords.mean(axis=0)
+                                for points in stations])
+    local = [points.coords - centroid
+             for points, centroid in zip(stations, local_centroids)]
+    fixed = None
+    if control is None or len(control) == 0:
+        control = {}
+        fixed = 0
+        global_centroid = local_centroids[0]
+    else:
+        control = as_pointset(control)
+        if len(control) < 3:
+            raise ValueError("At least three control points are needed")
+        global_centroid = control.coords.mean(axis=0)
+        control = dict(zip(control.names.tolist(),
+                           control.coords - global_centroid))
+    x, registered, known = _Initial_stations(station_points, local, control,
+                                             fixed)
+    if not registered.all():
+        raise ValueError("Station {} shares fewer than three points with the "
+                         "other stations".format(
+                             station_names[int(np.argmin(registered))]))
+
+    # Unknowns: 7 parameters of each free station, then 3 coordinates of
+    # each target that is not a control point
+    free = [s for s in range(len(stations)) if s != fixed]
+    station_column = np.full(len(stations), -1)
+    station_column[free] = 7 * np.arange(len(free))
+    point_names = sorted(name for name in known if name not in control)
+    point_column = {name: 7 * len(free) + 3 * j
+                    for j, name in enumerate(point_names)}
+    X = np.array([known[name] for name in point_names]).reshape(-1, 3)
+    unknowns = 7 * len(free) + 3 * len(point_names)
+
+    # Observations in station order, rows 3i..3i+2 belong to observation i
+    station_of = np.concatenate([np.full(len(points), s)
+                                 for s, points in enumerate(stations)])
+    observed = [name for names in station_points for name in names]
+    columns = np.array([point_column.get(name, -1) for name in observed])
+    fixed_point = columns < 0
+    target = np.zeros((len(observed), 3))
+    target[fixed_point] = np.array([control[name] for name, is_fixed
+                                    in zip(observed, fixed_point)
+                                    if is_fixed]).reshape(-1, 3)
+    redundancy = 3 * len(observed) - unknowns
+    if redundancy < 0:
+        raise ValueError("Not enough observations for the unknowns")
+
+    # Sparsity pattern, the same in every iteration
+    rows = 3 * np.arange(len(observed))[:, None] + np.arange(3)
+    has_station = station_column[station_of] >= 0
+    station_rows = np.repeat(rows[has_station], 7, axis=1).ravel()
+    station_cols = (station_column[station_of[has_station], None, None] +
+                    np.arange(7)[None, None, :]).repeat(3, axis=1).ravel()
+    point_rows = rows[~fixed_point].ravel()
+    point_cols = (columns[~fixed_point, None] + np.arange(3)).ravel()
+    matrix_rows = np.concatenate((station_rows, point_rows))
+    matrix_cols = np.concatenate((station_cols, point_cols))
+    point_data = -np.ones(len(point_rows))
+
+    def residuals():
+        # f = T + q*R@x - X of all observations
+        transformed = np.concatenate([Forward_model(x[s], local[s])
+                                      for s in range(len(stations))])
+        current = target.copy()
+        current[~fixed_point] = X[(columns[~fixed_point] - 7 * len(free))
+                                  // 3]
+        return (transformed - current).ravel()
+
+    def design():
+        J = [Jacobian(x[s], local[s]) for s in free]
+        station_data = (np.concatenate(J).ravel() if J else np.zeros(0))
+        return sparse.csr_matrix(
+            (np.concatenate((station_data, point_data)),
+             (matrix_rows, matrix_cols)),
+            shape=(3 * len(observed), unknowns))
+
+    counter = 0
+    status = MAX_ITERATIONS
+    f = residuals()
+    while counter < max_iter:
+        A = design()
+        N = (A.T @ A).tocsc()
+        dx = -splu(N).solve(A.T @ f)
+        # Far from the solution (long chains of stations tied to control
+        # at both ends) a full step can overshoot, it is halved until the
+        # squared residuals decrease
+        x_start = x.copy()
+        X_start = X.copy()
+        cost = f @ f
+        step = 1.0
+        for attempt in range(10):
+            x[free] = x_start[free] + step * dx[:7 * len(free)].reshape(-1, 7)
+            X = X_start + step * dx[7 * len(free):].reshape(-1, 3)
+            f = residuals()
+            decreased = f @ f <= cost
+            if decreased or attempt == 9:
+                break
+            step /= 2
+        counter += 1
+        # step is the applied one; after a failed line search only a full
+        # step below the threshold counts as converged
+        movement = np.abs(A @ dx).max(initial=0.0)
+        if movement <= threshold or (decreased and
+                                     step * movement <= threshold):
+            status = CONVERGED_STEP
+            break
+
+    residuals = -f.reshape(-1, 3)
+    ends = np.cumsum([len(points) for points in stations])[:-1]
+    all_names = point_names + list(control)
+    all_coords = np.concatenate((X, np.array(list(control.values())
+                                            ).reshape(-1, 3)))
+    return {'stations': {name: Normalized_parameters(Uncentered_parameters(
+                x_s, local_centroid, global_centroid))
+                         for name, x_s, local_centroid
+                         in zip(station_names, x, local_centroids)},
+            'points': PointSet(all_names, all_coords + global_centroid),
+            'residuals': dict(zip(station_names,
+                                  np.split(residuals, ends))),
+            'sigma0_squared': (f @ f / redundancy if redundancy > 0
+                               else np.nan),
+            'redundancy': redundancy,
+            'iterations': counter,
+            'status': status,
+            'message': STATUS_MESSAGES[status]}
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:47:20 2026
+
+Robust Helmert estimation: RANSAC on minimal 3-point samples followed by
+iteratively reweighted least squares (Huber or Tukey weights).
+"""
+
+import math
+
+import numpy as np
+from .Helmert3Dtransform import (Closed_form_parameters, Forward_model,
+                                 Helmert_adjustment, Normalized_parameters)
+from .batch import Forward_model_batch
+from .pointset import Identical_points
+
+# Median of the norm of a 3D standard normal vector, converts the median
+# point residual into a scale estimate
+MEDIAN_CHI_3 = 1.5382
+
+
+def Huber_weights(u, k=1.345):
+    """Huber weights of standardized residuals u"""
+    u = np.abs(u)
+    return np.where(u <= k, 1.0, k / np.maximum(u, k))
+
+
+def Tukey_weights(u, c=4.685):
+    """Tukey biweight weights of standardized residuals u"""
+    u = np.abs(u)
+    return np.where(u < c, (1 - (u / c)**2)**2, 0.0)
+
+
+def _Repeated_indices(samples):
+    """(n,) mask of the (n,3) index samples holding an index twice"""
+    return ((samples[:, 0] == samples[:, 1]) |
+            (samples[:, 0] == samples[:, 2]) |
+            (samples[:, 1] == samples[:, 2]))
+
+
+def Ransac_parameters(From_array, To_array, threshold, confidence=0.99,
+                      max_trials=1000, batch_size=64, rng=None):
+    """RANSAC over minimal 3-point samples of (N,3) identical point arrays.
+
+    Hypotheses are solved with the closed-form estimator and scored
+    batch_size at a time with one vectorized forward model. Sampling stops
+    as soon as the number of trials needed for the given confidence,
+    based on the best inlier ratio so far, has been reached.
+    Returns (x, inliers, trials) with inliers the (N,) boolean mask of
+    points closer than threshold to the best hypothesis."""
+    rng = np.random.default_rng(rng)
+    point_count = len(From_array)
+    if point_count < 3:
+        raise ValueError("Not enough identical points for transformation "
+                         "calculations.")
+    best_x = None
+    best_inliers = np.zeros(point_count, dtype=bool)
+    needed = max_trials
+    trials = 0
+    while trials < min(needed, max_trials):
+        size = min(batch_size, max_trials - trials)
+        samples = rng.integers(0, point_count, (size, 3))
+        # Samples repeating a point are drawn again, O(1) per hypothesis
+        # whatever the number of points
+        repeated = _Repeated_indices(samples)
+        while repeated.any():
+            samples[repeated] = rng.integers(0, point_count,
+                                             (repeated.sum(), 3))
+            repeated = _Repeated_indices(samples)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x = Closed_form_parameters(From_array[samples], To_array[samples])
+            TFrom = Forward_model_batch(
+                x, np.broadcast_to(From_array, (size,) + From_array.shape))
+            distances = np.linalg.norm(TFrom - To_array, axis=2)
+        inliers = distances <= threshold
+        counts = inliers.sum(axis=1)
+        best = np.argmax(counts)
+        if counts[best] > best_inliers.sum():
+            best_x = x[best]
+            best_inliers = inliers[best]
+            ratio = counts[best] / point_count
+            if ratio >= 1:
+                needed = 0
+            else:
+                needed = math.log(1 - confidence) / math.log(1 - ratio**3)
+        trials += size
+    return best_x, best_inliers, trials
+
+
+def Helmert_transform_robust(From, To, threshold, method="tukey",
+                             confidence=0.99, max_trials=1000,
+                             max_irls=20, rng=None):
+    """
+    Robust Helmert transformation with outlier reporting.
+
+    Parameters
+    ----------
+    From : PointSet or dict
+        Original points.
+    To : PointSet or dict
+        Target points, joined with From by point name.
+    threshold : float
+        Inlier distance between transformed From and To points,
+        in the coordinate unit.
+    method : str, optional
+        Reweighting function of the IRLS stage, "tukey"
+        (default, outliers get zero weight) or "huber".
+    confidence : float, optional
+        Probability of drawing at least one outlier-free sample,
+        RANSAC stops early once it is reached.
+    max_trials : int, optional
+        Upper limit of RANSAC hypotheses.
+    max_irls : int, optional
+        Maximum number of reweighting steps.
+    rng : int or np.random.Generator, optional
+        Seed or generator for reproducible sampling.
+
+    Returns
+    -------
+    Trans_par : np.ndarray
+        [dx, dy, dz, scale, rx, ry, rz] as Helmert_transform.
+    report : dict
+        'identicals' - point names in the order of the arrays,
+        'inliers' - boolean mask of points within threshold,
+        'residuals' - (N,3) To minus transformed From,
+        'weights' - final IRLS weights,
+        'trials' - number of RANSAC hypotheses scored.
+    """
+    if method == "tukey":
+        weight_function = Tukey_weights
+    elif method == "huber":
+        weight_function = Huber_weights
+    else:
+        raise ValueError("Unknown method: {}".format(method))
+    identicals, From_array, To_array = Identical_points(From, To)
+    if len(identicals) < 3:
+        raise ValueError("Not enough identical points for transformation "
+                         "calculations.")
+    x, inliers, trials = Ransac_parameters(From_array, To_array, threshold,
+                                           confidence, max_trials, rng=rng)
+    if x is None or inliers.sum() < 3:
+        raise ValueError("No consistent set of three points found")
+    # Least squares on the RANSAC inliers, then reweight all points
+    weights = inliers.astype(float)
+    x = Helmert_adjustment(x, From_array, To_array, weights)[0]
+    for _ in range(max_irls):
+        distances = np.linalg.norm(To_array - Forward_model(x, From_array),
+                                   axis=1)
+        scale = np.median(distances[weights > 0]) / MEDIAN_CHI_3
+        # Keep the scale above a tenth of the threshold, exact data would
+        # otherwise turn every tiny residual into an outlier
+        scale = max(scale, threshold / 10)
+        new_weights = weight_function(distances / scale)
+        if (new_weights > 0).sum() < 3:
+            break
+        converged = np.allclose(new_weights, weights, atol=1e-6)
+        weights = new_weights
+        x = Helmert_adjustment(x, From_array, To_array, weights)[0]
+        if converged:
+            break
+    residuals = To_array - Forward_model(x, From_array)
+    report = {'identicals': identicals,
+              'inliers': np.linalg.norm(residuals, axis=1) <= threshold,
+              'residuals': residuals,
+              'weights': weights,
+              'trials': trials}
+    return Normalized_parameters(x), report
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 10:12:40 2026
+
+Long-running transformation service, keeps the Helmert engine loaded for
+tools that would otherwise start a Python process per small problem.
+
+Requests are JSON objects, one per line, over a Unix socket or localhost
+TCP. Responses come back one per line in order of completion and carry
+the "id" of their request:
+
+    {"id": 1, "op": "estimate", "From": {"P1": [x, y, z], ...},
+     "To": {"P1": [x, y, z], ...}}
+    -> {"id": 1, "parameters": [dx, dy, dz, scale, rx, ry, rz],
+        "converged": true, "identicals": ["P1", ...]}
+    {"id": 2, "op": "transform", "parameters": [...], "points": [[x, y, z]]}
+    -> {"id": 2, "points": [[x, y, z]]}
+    {"id": 3, "op": "metrics"}
+    -> {"id": 3, "queue_depth": 0, "latency_ms": {...}, ...}
+
+Requests arriving within the batching window are coalesced: all
+estimations are solved together by Helmert_transform_batch and all
+transformations with the same parameters are applied in one pass.
+
+    python -m Helmert_new.service --socket /tmp/helmert.sock
+    python -m Helmert_new.service --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import time
+from collections import deque
+
+import numpy as np
+from .Helmert3Dtransform import as_key
+from .batch import Helmert_transform_batch
+from .pointset import Identical_points
+
+LINE_LIMIT = 2**26  # longest request line [bytes]
+
+
+def _Estimate_batch(estimates):
+    """Solves [(identicals, From_array, To_array)] together.
+    Returns a response dict per problem"""
+    x, converged = Helmert_transform_batch(
+        [From_array for _, From_array, _ in estimates],
+        [To_array for _, _, To_array in estimates])
+    return [{'parameters': x_b.tolist(),
+             'converged': bool(converged_b),
+             'identicals': identicals}
+            for (identicals, _, _), x_b, converged_b
+            in zip(estimates, x, converged)]
+
+
+def Process_batch(requests):
+    """
+    Answer a list of coalesced requests.
+
+    Parameters
+    ----------
+    requests : list
+        Request dicts with op "estimate" or "transform" (see the
+        module docstring).
+
+    Returns
+    -------
+    list
+        Response dict per request, in the same order. A request
+        that cannot be answered gets {"error": message} without
+        failing the rest of the batch.
+    """
+    responses = [None] * len(requests)
+    estimates = []
+    transforms = {}
+    for i, request in enumerate(requests):
+        try:
+            if request['op'] == 'estimate':
+                problem = Identical_points(request['From'], request['To'])
+                if len(problem[0]) < 3:
+                    raise ValueError("Not enough identical points for "
+                                     "transformation calculations.")
+                estimates.append((i, problem))
+            elif request['op'] == 'transform':
+                parameters = tuple(float(p) for p in request['parameters'])
+                if len(parameters) != 7:
+                    raise ValueError("Seven transformation parameters are "
+                                     "needed")
+                points = np.asarray(request['points'],
+                                    dtype=float).reshape(-1, 3)
+                transforms.setdefault(parameters, []).append((i, points))
+            else:
+                raise ValueError("Unknown op: {}".format(request['op']))
+        except Exception as error:
+            # Any malformed input (e.g. From not a dictionary) only fails
+            # its own request
+            responses[i] = {'error': str(error)}
+    if estimates:
+        try:
+            solved = _Estimate_batch([problem for _, problem in estimates])
+        except Exception:
+            # A degenerate problem fails the stacked solve, retry one by one
+            solved = []
+            for _, problem in estimates:
+                try:
+                    solved += _Estimate_batch([problem])
+                except Exception as error:
+                    solved.append({'error': str(error)})
+        for (i, _), response in zip(estimates, solved):
+            responses[i] = response
+    for parameters, group in transforms.items():
+        rows = [i for i, _ in group]
+        sizes = [len(points) for _, points in group]
+        try:
+            transformed = as_key(parameters).apply(
+                np.concatenate([points for _, points in group]))
+        except Exception as error:
+            for i in rows:
+                responses[i] = {'error': str(error)}
+            continue
+        for i, points in zip(rows, np.split(transformed,
+                                            np.cumsum(sizes)[:-1])):
+            responses[i] = {'points': points.tolist()}
+    for request, response in zip(requests, responses):
+        if isinstance(request, dict) and 'id' in request:
+            response['id'] = request['id']
+    return responses
+
+
+class HelmertService():
+    """Coalesces concurrent requests into micro-batches.
+
+    submit() queues a request and waits for its response. A single worker
+    task waits window seconds after the first queued request, takes up to
+    max_batch requests and answers them with Process_batch in a worker
+    thread, so new requests keep queueing meanwhile. Queue depth, batch
+    sizes and request latencies (queueing plus solving) are recorded,
+    see metrics().
+    """
+
+    def __init__(self, window=0.002, max_batch=1024):
+        self.window = window
+        self.max_batch = max_batch
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=10000)
+        self._pending = []
+        self._wakeup = None
+        self._worker = None
+
+    @property
+    def queue_depth(self):
+        return len(self._pending)
+
+    def metrics(self):
+        """Counters and latency percentiles [ms] of the recent requests"""
+        latencies = np.array(self.latencies) * 1000
+        percentiles = {}
+        if len(latencies):
+            percentiles = dict(zip(('p50', 'p95', 'p99'), np.percentile(
+                latencies, (50, 95, 99)).tolist()))
+            percentiles['max'] = float(latencies.max())
+        answered = self.requests - self.queue_depth
+        return {'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_size': (answered / self.batches
+                                    if self.batches else 0.0),
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'latency_ms': percentiles}
+
+    async def submit(self, request):
+        """Queues one request (dict) and returns its response (dict)"""
+        if request.get('op') == 'metrics':
+            response = self.metrics()
+            if 'id' in request:
+                response['id'] = request['id']
+            return response
+        loop = asyncio.get_running_loop()
+        if self._worker is None:
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        self._pending.append((request, future, time.perf_counter()))
+        self.requests += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        self._wakeup.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            # Let concurrent requests arrive before taking the batch
+            await asyncio.sleep(self.window)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            if not self._pending:
+                self._wakeup.clear()
+            self.batches += 1
+            try:
+                responses = await loop.run_in_executor(
+                    None, Process_batch, [request for request, _, _
+                                          in batch])
+            except Exception:
+                # Never fail the whole coalesced batch, answer one by one
+                responses = []
+                for request, _, _ in batch:
+                    try:
+                        responses += await loop.run_in_executor(
+                            None, Process_batch, [request])
+                    except Exception as error:
+                        responses.append({'error': str(error)})
+            done = time.perf_counter()
+            for (_, future, queued), response in zip(batch, responses):
+                self.latencies.append(done - queued)
+                if not future.done():
+                    future.set_result(response)
+
+    async def handle(self, reader, writer):
+        """Serves one connection, requests on it are answered concurrently"""
+        tasks = set()
+        async def answer(line):
+            request = {}
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    request = {}
+                    raise ValueError("Requests have to be JSON objects")
+                response = await self.submit(request)
+            except ValueError as error:
+                response = {'error': str(error)}
+            if 'id' in request:
+                response = dict(response, id=request['id'])
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        writer.close()
+
+    async def serve(self, path=None, host='127.0.0.1', port=8765):
+        """Serves on the Unix socket path, or on host:port without one"""
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path,
+                                                     limit=LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(self.handle, host, port,
+                                                limit=LINE_LIMIT)
+        async with server:
+            await server.serve_forever()
+
+
+def Request(requests, path=None, host='127.0.0.1', port=8765):
+    """Sends a list of request dicts over one connection and returns the
+    responses in the order of the requests (blocking client)"""
+    requests = [dict(request, id=request.get('id', i))
+                for i, request in enumerate(requests)]
+    if path is not None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(path)
+    else:
+        connection = socket.create_connection((host, port))
+    responses = {}
+    with connection, connection.makefile('rb') as reader:
+        connection.sendall(''.join(json.dumps(request) + '\n'
+                                   for request in requests).encode())
+        while len(responses) < len(requests):
+            line = reader.readline()
+            if not line:
+                raise ConnectionError("Service closed the connection")
+            response = json.loads(line)
+            responses[response.get('id')] = response
+    return [responses.get(request['id']) for request in requests]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--socket', help='Unix socket path to listen on')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--window', type=float, default=2.0,
+                        help='batching window [ms]')
+    parser.add_argument('--max-batch', type=int, default=1024,
+                        help='most requests answered per batch')
+    args = parser.parse_args(argv)
+    service = HelmertService(args.window / 1000, args.max_batch)
+    try:
+        asyncio.run(service.serve(args.socket, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
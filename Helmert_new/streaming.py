@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 15:31:08 2026
+
+Chunked, bounded-memory application of transformation parameters to
+point files ('name x y z ...' whitespace or CSV lines), and estimation of
+the parameters from correspondences streamed chunk by chunk.
+"""
+
+import time
+from itertools import islice
+
+import numpy as np
+from .Helmert3Dtransform import (Forward_model, Jacobian,
+                                 Closed_form_parameters, Reduced_coordinates,
+                                 Centered_parameters, Uncentered_parameters,
+                                 Uncentering_jacobian,
+                                 Normalized_parameters, as_key,
+                                 X_Rotation, Y_Rotation, Z_Rotation,
+                                 dX_Rotation, dY_Rotation, dZ_Rotation,
+                                 MAX_ITERATIONS, CONVERGED_LINEARIZATION,
+                                 STATUS_MESSAGES)
+
+
+def Detect_delimiter(file_path):
+    """Returns ',' for CSV point files, None (any whitespace) otherwise"""
+    with open(file_path, 'r') as file:
+        for line in file:
+            if line.strip() and not line.lstrip().startswith('#'):
+                return ',' if ',' in line else None
+    return None
+
+
+def Read_point_chunks(file_path, chunk_size=100000, delimiter=None):
+    """Reads a point file in chunks of at most chunk_size lines.
+
+    Yields (lines, rows, names, coords) where lines are the raw lines of
+    the chunk, rows the indices of the lines holding points, names their
+    point IDs and coords an (n,3) array. Comments, headers and short lines
+    are kept in lines but not parsed."""
+    with open(file_path, 'r') as file:
+        while True:
+            lines = list(islice(file, chunk_size))
+            if not lines:
+                break
+            rows = []
+            names = []
+            values = []
+            for i, line in enumerate(lines):
+                if line.lstrip().startswith('#'):
+                    continue
+                parts = line.split(delimiter)
+                if len(parts) < 4:
+                    continue
+                try:
+                    xyz = [float(parts[1]), float(parts[2]), float(parts[3])]
+                except ValueError:
+                    continue  # header line
+                rows.append(i)
+                names.append(parts[0].strip())
+                values.append(xyz)
+            coords = np.array(values, dtype=float).reshape(-1, 3)
+            yield lines, rows, names, coords
+
+
+def Transform_file(x, input_path, output_path, chunk_size=100000,
+                   delimiter='auto', precision=6, verbose=False):
+    """
+    Apply transformation parameters to a point file chunk by chunk.
+
+    Parameters
+    ----------
+    x : HelmertKey or array_like
+        Transformation parameters [dx, dy, dz, scale, rx, ry, rz]
+        as returned by Helmert_transform.
+    input_path : str
+        Point file with 'name x y z [extra columns]' lines.
+    output_path : str
+        File the transformed points are written to, extra
+        columns, comments and headers are copied unchanged.
+    chunk_size : int, optional
+        Number of lines held in memory at a time.
+    delimiter : str or None, optional
+        Column separator, None for whitespace, 'auto' detects
+        CSV files from the first data line.
+    precision : int, optional
+        Number of decimals of the written coordinates.
+    verbose : bool, optional
+        Print the throughput summary when finished.
+
+    Returns
+    -------
+    dict
+        'points', 'chunks', 'seconds' and 'points_per_second'.
+    """
+    if delimiter == 'auto':
+        delimiter = Detect_delimiter(input_path)
+    separator = delimiter if delimiter is not None else ' '
+    number = '{:.%df}' % precision
+    key = as_key(x)
+    points = 0
+    chunks = 0
+    start = time.perf_counter()
+    with open(output_path, 'w') as out_file:
+        for lines, rows, names, coords in Read_point_chunks(
+                input_path, chunk_size, delimiter):
+            transformed = key.apply(coords)
+            for row, name, xyz in zip(rows, names, transformed.tolist()):
+                parts = lines[row].rstrip('\r\n').split(delimiter)
+                parts = [name] + [number.format(c) for c in xyz] + \
+                    [part.strip() for part in parts[4:]]
+                lines[row] = separator.join(parts) + '\n'
+            out_file.writelines(lines)
+            points += len(rows)
+            chunks += 1
+    seconds = time.perf_counter() - start
+    stats = {'points': points,
+             'chunks': chunks,
+             'seconds': seconds,
+             'points_per_second': points / seconds if seconds > 0 else 0.0}
+    if verbose:
+        print("{}: {} points in {:.3f} s ({:.0f} points/s)".format(
+            input_path, points, seconds, stats['points_per_second']))
+    return stats
+
+
+def Read_correspondence_chunks(file_path, chunk_size=100000, delimiter=None):
+    """Reads 'name xFrom yFrom zFrom xTo yTo zTo' lines in chunks.
+    Yields (From_chunk, To_chunk) pairs of (n,3) arrays"""
+    with open(file_path, 'r') as file:
+        while True:
+            lines = list(islice(file, chunk_size))
+            if not lines:
+                break
+            values = []
+            for line in lines:
+                parts = line.split(delimiter)
+                if len(parts) < 7 or line.lstrip().startswith('#'):
+                    continue
+                try:
+                    values.append([float(part) for part in parts[1:7]])
+                except ValueError:
+                    continue  # header line
+            values = np.array(values, dtype=float).reshape(-1, 6)
+            yield values[:, :3], values[:, 3:]
+
+
+def Array_chunks(From_array, To_array, chunk_size=100000):
+    """Yields (From_chunk, To_chunk) slices of two (N,3) arrays (memmaps
+    are only read chunk by chunk)"""
+    for start in range(0, len(From_array), chunk_size):
+        yield (np.asarray(From_array[start:start + chunk_size], dtype=float),
+               np.asarray(To_array[start:start + chunk_size], dtype=float))
+
+
+def Accumulate_normal_equations(x, chunks, model=None):
+    """Sums the normal matrix A.T @ A (7x7), the right-hand side A.T @ l'
+    and l'.T @ l' over (From_chunk, To_chunk) pairs, without ever holding
+    the full design matrix. Returns (N, n, ll, point_count).
+    model is an optional transformation model from models.py"""
+    forward = Forward_model if model is None else model.forward
+    jacobian = Jacobian if model is None else model.jacobian
+    N = np.zeros((len(x), len(x)))
+    n = np.zeros(len(x))
+    ll = 0.0
+    count = 0
+    for From_chunk, To_chunk in chunks:
+        A = jacobian(x, From_chunk)
+        l_prime = (forward(x, From_chunk) - To_chunk).ravel()
+        N += A.T @ A
+        n += A.T @ l_prime
+        ll += l_prime @ l_prime
+        count += len(From_chunk)
+    return N, n, ll, count
+
+
+def _Linearization_error(x_old, dx, x_new, From_chunk):
+    """max |F(x_old) + A(x_old) @ dx - F(x_new)| over a chunk, the vI - vII
+    convergence metric of Helmert_transform without building A"""
+    RX = X_Rotation(x_old[4])
+    RY = Y_Rotation(x_old[5])
+    RZ = Z_Rotation(x_old[6])
+    dM = dx[3] * RX @ RY @ RZ + x_old[3] * (
+        dx[4] * dX_Rotation(x_old[4]) @ RY @ RZ +
+        dx[5] * RX @ dY_Rotation(x_old[5]) @ RZ +
+        dx[6] * RX @ RY @ dZ_Rotation(x_old[6]))
+    vI = Forward_model(x_old, From_chunk) + From_chunk @ dM.T + dx[0:3]
+    vII = Forward_model(x_new, From_chunk)
+    return np.abs(vI - vII).max(initial=0.0)
+
+
+def _Leading_points(chunks, minimum_points=3):
+    """From and To of the leading (From_chunk, To_chunk) pairs, concatenated
+    until they hold minimum_points points spanning minimum_points - 1
+    dimensions (three non-collinear points for the Helmert transformation).
+    Raises ValueError when the chunks run out first"""
+    From_chunks = []
+    To_chunks = []
+    for From_chunk, To_chunk in chunks:
+        From_chunks.append(From_chunk)
+        To_chunks.append(To_chunk)
+        From_points = np.concatenate(From_chunks)
+        if len(From_points) >= minimum_points and np.linalg.matrix_rank(
+                From_points - From_points.mean(axis=0)) >= minimum_points - 1:
+            return From_points, np.concatenate(To_chunks)
+    raise ValueError("Not enough identical points for transformation "
+                     "calculations.")
+
+
+def Helmert_transform_streaming(source, x0=None, chunk_size=100000,
+                                max_iter=10, threshold=0.0000000001,
+                                model=None, return_stats=False):
+    """
+    Helmert transformation from correspondences streamed in chunks.
+
+    Each Gauss-Newton iteration makes one pass over the data
+    and accumulates the 7x7 normal equations chunk by chunk,
+    the 3N x 7 design matrix is never built. Memory use is
+    bounded by chunk_size, whatever the number of points.
+
+    Parameters
+    ----------
+    source : tuple or callable
+        Either a (From_array, To_array) pair of (N,3) arrays or
+        memmaps of identical points in matching order, or a
+        callable returning a fresh iterator of (From_chunk,
+        To_chunk) pairs for every pass, e.g.
+        lambda: Read_correspondence_chunks(path).
+    x0 : array_like, optional
+        Starting parameters, by default the closed-form
+        solution of the leading chunks holding three
+        non-collinear points (usually the first chunk).
+    chunk_size : int, optional
+        Points per chunk when source is a pair of arrays.
+    max_iter : int, optional
+        Maximum number of iterations.
+    threshold : float, optional
+        Convergence threshold on the linearization error, as
+        in Helmert_transform.
+    model : TransformationModel, optional
+        Other transformation model from models.py, by default
+        the 7-parameter Helmert transformation.
+    return_stats : bool, optional
+        Also return the accuracy and the termination status.
+
+    Returns
+    -------
+    np.ndarray
+        [dx, dy, dz, scale, rx, ry, rz] as Helmert_transform, or
+        the parameters of the given model.
+    dict
+        Only with return_stats=True: 'sigma0_squared',
+        'redundancy', 'Qxx', 'Cxx' (see Helmert_statistics, no
+        residuals are kept), 'iterations', 'status' (see
+        STATUS_MESSAGES) and 'message'.
+
+    Note
+    ----
+    - The chunks are reduced by the centroids of the same
+      leading chunks, see Reduced_coordinates.
+    """
+    if callable(source):
+        chunks = source
+    else:
+        From_array, To_array = source
+        def chunks():
+            return Array_chunks(From_array, To_array, chunk_size)
+    From_points, To_points = _Leading_points(
+        chunks(), 3 if model is None else model.minimum_points)
+    From_reduced, To_reduced, From_centroid, To_centroid = \
+        Reduced_coordinates(From_points, To_points)
+    def reduced_chunks():
+        for From_chunk, To_chunk in chunks():
+            yield From_chunk - From_centroid, To_chunk - To_centroid
+    if x0 is not None:
+        x = Centered_parameters(x0, From_centroid, To_centroid, model)
+    elif model is None:
+        x = Closed_form_parameters(From_reduced, To_reduced)
+    else:
+        x = model.initial(From_reduced, To_reduced)
+    N, n, ll, count = Accumulate_normal_equations(x, reduced_chunks(), model)
+    metric = threshold + 1
+    counter = 0
+    while (metric > threshold) and (counter < max_iter):
+        dx = -np.linalg.solve(N, n)
+        x_old = x.copy()
+        x += dx
+        metric = 0.0
+        N = np.zeros((len(x), len(x)))
+        n = np.zeros(len(x))
+        ll = 0.0
+        # One pass both checks the last step and builds the next system
+        for From_chunk, To_chunk in reduced_chunks():
+            if model is None:
+                error = _Linearization_error(x_old, dx, x, From_chunk)
+            else:
+                vI = (model.forward(x_old, From_chunk).ravel() +
+                      model.jacobian(x_old, From_chunk) @ dx)
+                vII = model.forward(x, From_chunk).ravel()
+                error = np.abs(vI - vII).max(initial=0.0)
+            metric = max(metric, error)
+            N_chunk, n_chunk, ll_chunk, _ = Accumulate_normal_equations(
+                x, [(From_chunk, To_chunk)], model)
+            N += N_chunk
+            n += n_chunk
+            ll += ll_chunk
+        counter += 1
+    status = CONVERGED_LINEARIZATION
+    if counter == max_iter and metric > threshold:
+        status = MAX_ITERATIONS
+    x_reduced = x
+    x = Uncentered_parameters(x_reduced, From_centroid, To_centroid, model)
+    if model is not None:
+        Trans_par = model.normalized(x)
+    else:
+        Trans_par = Normalized_parameters(x)
+    if not return_stats:
+        return Trans_par
+    redundancy = np.size(To_centroid) * count - len(x)
+    sigma0_squared = ll / redundancy if redundancy > 0 else np.nan
+    J = Uncentering_jacobian(x_reduced, From_centroid, model)
+    Qxx = J @ np.linalg.inv(N) @ J.T
+    stats = {'sigma0_squared': sigma0_squared,
+             'redundancy': redundancy,
+             'Qxx': Qxx,
+             'Cxx': sigma0_squared * Qxx,
+             'iterations': counter,
+             'status': status,
+             'message': STATUS_MESSAGES[status]}
+    return Trans_par, stats
@@ -15,8 +15,9 @@ def print_last_line_with_number(filename):
         else:
             print("The file is empty.")
 
-# Replace 'yourfile.csv' with the path to your CSV file.
-filename = 'V:/Projekte/PETRA4/Pillar stability Tests/06Aug24 Instrument Stand Prototype 0 - LT_Arm_Seismo/Channels_300.csv'
-print_last_line_with_number(filename)
-filename = 'V:/Projekte/PETRA4/Pillar stability Tests/06Aug24 Instrument Stand Prototype 0 - LT_Arm_Seismo/Channels.csv'
-print_last_line_with_number(filename)
\ No newline at end of file
+if __name__ == "__main__":
+    # Replace 'yourfile.csv' with the path to your CSV file.
+    filename = 'V:/Projekte/PETRA4/Pillar stability Tests/06Aug24 Instrument Stand Prototype 0 - LT_Arm_Seismo/Channels_300.csv'
+    print_last_line_with_number(filename)
+    filename = 'V:/Projekte/PETRA4/Pillar stability Tests/06Aug24 Instrument Stand Prototype 0 - LT_Arm_Seismo/Channels.csv'
+    print_last_line_with_number(filename)
@@ -1,6 +1,3 @@
-from mpl_toolkits.mplot3d import Axes3D
-from matplotlib.patches import Ellipse
-import matplotlib.pyplot as plt
 import numpy as np
 
 def plot_ellipsoid(cov_matrix, mean, ax=None, n_std=1.0):
@@ -12,6 +9,10 @@ def plot_ellipsoid(cov_matrix, mean, ax=None, n_std=1.0):
     :param ax: Matplotlib 3D axis object
     :param n_std: Number of standard deviations to determine the ellipsoid's radii
     """
+    # matplotlib is only loaded when plotting
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import Axes3D  # registers the '3d' projection
+
     if ax is None:
         ax = plt.gca(projection='3d')
 
@@ -34,15 +35,18 @@ def plot_ellipsoid(cov_matrix, mean, ax=None, n_std=1.0):
 
     ax.plot_surface(x, y, z, color='r', alpha=0.3)
 
-# Example usage
-cov_matrix = np.array([[5, 2, 1], [2, 3, 1], [1, 1, 4]])  # Sample 3x3 covariance matrix
-mean = [0, 0, 0]  # Mean or center point
-
-fig = plt.figure()
-ax = fig.add_subplot(111, projection='3d')
-plot_ellipsoid(cov_matrix, mean, ax, n_std=2)
-ax.set_xlabel('X-axis')
-ax.set_ylabel('Y-axis')
-ax.set_zlabel('Z-axis')
-plt.title('3D Error Ellipsoid')
-plt.show()
\ No newline at end of file
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    # Example usage
+    cov_matrix = np.array([[5, 2, 1], [2, 3, 1], [1, 1, 4]])  # Sample 3x3 covariance matrix
+    mean = [0, 0, 0]  # Mean or center point
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111, projection='3d')
+    plot_ellipsoid(cov_matrix, mean, ax, n_std=2)
+    ax.set_xlabel('X-axis')
+    ax.set_ylabel('Y-axis')
+    ax.set_zlabel('Z-axis')
+    plt.title('3D Error Ellipsoid')
+    plt.show()
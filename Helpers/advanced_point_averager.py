@@ -164,17 +164,18 @@ def write_combined_points_to_file(combined_points, output_file_path):
     except Exception as e:
         raise IOError(f"Error writing to file {output_file_path}: {e}")
 
-# Define the paths to the text files
-file_paths = ['Helpers/0_Point List.txt', 'Helpers/1_Point List.txt', 'Helpers/2_Point List.txt']
+if __name__ == "__main__":
+    # Define the paths to the text files
+    file_paths = ['Helpers/0_Point List.txt', 'Helpers/1_Point List.txt', 'Helpers/2_Point List.txt']
 
-# Read and aggregate points from the text files
-all_points = aggregate_points(file_paths)
+    # Read and aggregate points from the text files
+    all_points = aggregate_points(file_paths)
 
-# Combine points and calculate the new coordinates, covariance matrices, and standard deviations
-combined_points = combine_points(all_points)
+    # Combine points and calculate the new coordinates, covariance matrices, and standard deviations
+    combined_points = combine_points(all_points)
 
-# Print the sorted points by their sigma_xy
-print_sorted_points(combined_points)
+    # Print the sorted points by their sigma_xy
+    print_sorted_points(combined_points)
 
-output_file_path = 'Helpers/output.txt'
-write_combined_points_to_file(combined_points, output_file_path)
\ No newline at end of file
+    output_file_path = 'Helpers/output.txt'
+    write_combined_points_to_file(combined_points, output_file_path)
@@ -1,10 +1,10 @@
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-from matplotlib.patches import Ellipse
+
+# pandas and matplotlib are imported inside the functions using them, so
+# importing this module stays cheap
 
 def read_input_file(file_path):
+    import pandas as pd
     # Read the text file into a pandas DataFrame
     df = pd.read_csv(file_path, delim_whitespace=True)
     
@@ -16,14 +16,13 @@ def read_input_file(file_path):
     ]
     return df
 
-# Example usage
-file_path = 'V:\Projekte\PETRA4\Simulationen\Girder alignment\PP Outcome\Points_out.txt'
-data = read_input_file(file_path)
-
 def plot_error_ellipses(data):
     """
     Plot 2D error ellipses for each point in the data.
     """
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Ellipse
+
     fig, ax = plt.subplots()
 
     for idx, row in data.iterrows():
@@ -47,6 +46,9 @@ def plot_error_ellipsoids(data):
     """
     Plot 3D error ellipsoids for each point in the data.
     """
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import Axes3D  # registers the '3d' projection
+
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
 
@@ -89,6 +91,9 @@ def plot_error_ellipsoids(data):
     plt.title('3D Error Ellipsoids')
     plt.show()
 
-# Example usage
-plot_error_ellipses(data)
-plot_error_ellipsoids(data)
+if __name__ == "__main__":
+    # Example usage
+    file_path = 'V:\Projekte\PETRA4\Simulationen\Girder alignment\PP Outcome\Points_out.txt'
+    data = read_input_file(file_path)
+    plot_error_ellipses(data)
+    plot_error_ellipsoids(data)
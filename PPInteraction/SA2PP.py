@@ -1,4 +1,3 @@
-import pandas as pd
 import re
 import os
 from datetime import datetime  # Import for timestamp generation
@@ -64,6 +63,7 @@ def find_instrument_and_observations(file_path, log_data):
     Reads the Excel file and finds where each instrument and its observations start.
     Extracts instrument information and the corresponding observations.
     """
+    import pandas as pd  # only loaded when reading the report
     xls = pd.ExcelFile(file_path)
     data = xls.parse(xls.sheet_names[0])  # Read the entire sheet
 
@@ -326,50 +326,57 @@ def save_log(log_data, renaming_key, file_name):
 
 # --------------------- Script Execution ---------------------
 
-# Initialize log data
-log_data = []
-
-# Step 1: Read instrument and observation data
-xls = pd.ExcelFile(OBSERVATIONS_FILE)
-data = xls.parse(xls.sheet_names[0])  # Full DataFrame containing both instrument and observation data
-matched_data, units = find_instrument_and_observations(OBSERVATIONS_FILE, log_data)
-if matched_data is None:
-    log_message("Error in finding instruments and observations.", log_data)
-else:
-    # Step 2: Read coordinates and create renaming scheme
-    coordinates = read_coordinates(COORDINATES_FILE, log_data)
-    renaming_key = create_renaming_scheme(coordinates)
-
-    # Extract instrument coordinates for saving later
-    instrument_coords = {}
-    for instr_name, station_number, observations in matched_data:
-        index = observations.index.start - 5  # Adjust based on the starting index of the instrument data in the full DataFrame
-        instrument_coords[station_number] = extract_instrument_coordinates(data, index)
-
-    # Check for instrument ID conflicts with the renaming scheme
-    instruments = [(index, instr_name) for index, (instr_name, station_number, observations) in enumerate(matched_data)]
-    check_instrument_conflicts(instruments, renaming_key)
+def main():
+    import pandas as pd  # only loaded when reading the report
 
-    measurements_output = []
+    # Initialize log data
+    log_data = []
 
-    # Step 3: Process each instrument's observations
-    for instr_name, station_number, observations in matched_data:
-        try:
-            # Process the observations to get measurements
-            instr_measurements = process_data(
-                observations, coordinates, station_number, renaming_key, log_data, units
-            )
-            measurements_output.extend(instr_measurements)
-
-        except ValueError as e:
-            log_message(str(e), log_data)
-
-    # Step 4: Save the processed data and coordinates
-    save_to_file(measurements_output, OUTPUT_MEASUREMENTS_FILE)
-    save_coordinates(coordinates, renaming_key, instrument_coords, OUTPUT_COORDINATES_FILE)
-    log_message(f"Saved measurements to {OUTPUT_MEASUREMENTS_FILE}", log_data)
-    log_message(f"Saved coordinates to {OUTPUT_COORDINATES_FILE}", log_data)
-
-    # Save the log file along with the renaming key
-    save_log(log_data, renaming_key, LOG_FILE)
-    log_message(f"Log saved to {LOG_FILE}", log_data)
\ No newline at end of file
+    # Step 1: Read instrument and observation data
+    xls = pd.ExcelFile(OBSERVATIONS_FILE)
+    data = xls.parse(xls.sheet_names[0])  # Full DataFrame containing both instrument and observation data
+    matched_data, units = find_instrument_and_observations(OBSERVATIONS_FILE, log_data)
+    if matched_data is None:
+        log_message("Error in finding instruments and observations.", log_data)
+    else:
+        # Step 2: Read coordinates and create renaming scheme
+        coordinates = read_coordinates(COORDINATES_FILE, log_data)
+        renaming_key = create_renaming_scheme(coordinates)
+
+        # Extract instrument coordinates for saving later
+        instrument_coords = {}
+        for instr_name, station_number, observations in matched_data:
+            index = observations.index.start - 5  # Adjust based on the starting index of the instrument data in the full DataFrame
+            instrument_coords[station_number] = extract_instrument_coordinates(data, index)
+
+        # Check for instrument ID conflicts with the renaming scheme
+        instruments = [(index, instr_name) for index, (instr_name, station_number, observations) in enumerate(matched_data)]
+        check_instrument_conflicts(instruments, renaming_key)
+
+        measurements_output = []
+
+        # Step 3: Process each instrument's observations
+        for instr_name, station_number, observations in matched_data:
+            try:
+                # Process the observations to get measurements
+                instr_measurements = process_data(
+                    observations, coordinates, station_number, renaming_key, log_data, units
+                )
+                measurements_output.extend(instr_measurements)
+
+            except ValueError as e:
+                log_message(str(e), log_data)
+
+        # Step 4: Save the processed data and coordinates
+        save_to_file(measurements_output, OUTPUT_MEASUREMENTS_FILE)
+        save_coordinates(coordinates, renaming_key, instrument_coords, OUTPUT_COORDINATES_FILE)
+        log_message(f"Saved measurements to {OUTPUT_MEASUREMENTS_FILE}", log_data)
+        log_message(f"Saved coordinates to {OUTPUT_COORDINATES_FILE}", log_data)
+
+        # Save the log file along with the renaming key
+        save_log(log_data, renaming_key, LOG_FILE)
+        log_message(f"Log saved to {LOG_FILE}", log_data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:30:02 2026
+
+Benchmarks of the Helmert estimation and transformation paths.
+
+Synthetic identical points are generated by scaling the geometry of
+Testing_data.txt (a ~30 m local network transformed into ECEF) from 6 up
+to 10^7 points, with the known parameters of that data set as ground
+truth. For every case the wall time, the iterations and the peak memory
+are recorded and written as JSON, so runs can be compared over time:
+
+    python benchmarks/bench_helmert.py --max-points 100000 -o new.json
+    python benchmarks/bench_helmert.py --compare old.json new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+
+from Helmert_new.Helmert3Dtransform import (  # noqa: E402
+    Build_A, Build_TFrom, Forward_model, Helmert_transform, Transformation)
+from Helmert_new.pointset import PointSet  # noqa: E402
+
+# Geometry and parameters of Testing_data.txt
+TESTING_FROM = np.array([[744970.551, 1040944.109, 224.592],
+                         [744966.969, 1040938.331, 224.390],
+                         [744958.051, 1040931.492, 224.057],
+                         [744950.344, 1040928.731, 223.676],
+                         [744945.677, 1040924.795, 223.472],
+                         [744943.006, 1040920.538, 223.352]])
+TRUE_PARAMETERS = np.array([2.98027817e+06, 1.37948616e+06, 5.59696765e+06,
+                            1.00016673, 0.204758250, 0.670278274,
+                            1.11095571])
+SIZES = (6, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+def Synthetic_points(count, noise=0.001, seed=0):
+    """(From, To) PointSets of count identical points spread over the
+    extent of the Testing_data.txt network (scaled up with the point count
+    so the density stays similar), To from the true parameters plus
+    Gaussian noise [m]"""
+    rng = np.random.default_rng(seed)
+    if count == len(TESTING_FROM):
+        From_array = TESTING_FROM.copy()
+    else:
+        centre = TESTING_FROM.mean(axis=0)
+        extent = np.ptp(TESTING_FROM, axis=0) + 1.0
+        extent *= max(1.0, (count / len(TESTING_FROM))**(1 / 3))
+        From_array = centre + (rng.random((count, 3)) - 0.5) * extent
+    To_array = Forward_model(TRUE_PARAMETERS, From_array)
+    To_array += rng.normal(scale=noise, size=To_array.shape)
+    names = np.char.add('P', np.arange(count).astype(str))
+    return PointSet(names, From_array), PointSet(names, To_array)
+
+
+def Measure(function, repeat=3):
+    """Best wall time of repeat calls, and the peak memory of one call
+    traced separately (tracing slows the call down)"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, min(times), peak
+
+
+def Run_cases(max_points=100000, repeat=3):
+    """Runs all cases up to max_points points, returns a list of records"""
+    records = []
+    for count in [size for size in SIZES if size <= max_points]:
+        From, To = Synthetic_points(count)
+        identicals = list(From.names)
+        repeat_count = repeat if count <= 1000000 else 1
+        cases = {
+            'Helmert_transform': lambda: Helmert_transform(
+                From, To, return_stats=True),
+            'Helmert_transform_closed_form': lambda: Helmert_transform(
+                From, To, solver='closed_form', return_stats=True),
+            'Build_A': lambda: Build_A(TRUE_PARAMETERS, From, identicals),
+            'Build_TFrom': lambda: Build_TFrom(TRUE_PARAMETERS, From,
+                                               identicals),
+            'Transformation_pointset': lambda: Transformation(
+                TRUE_PARAMETERS, From),
+            'Transformation_array': lambda: Transformation(
+                TRUE_PARAMETERS, From.coords),
+        }
+        for case, function in cases.items():
+            result, seconds, peak = Measure(function, repeat_count)
+            record = {'case': case,
+                      'points': count,
+                      'seconds': seconds,
+                      'points_per_second': count / seconds,
+                      'peak_memory_bytes': peak}
+            if case.startswith('Helmert_transform'):
+                parameters, stats = result
+                record['iterations'] = stats['iterations']
+                record['max_parameter_error'] = float(np.abs(
+                    parameters - TRUE_PARAMETERS)[4:].max())
+            records.append(record)
+            print("{:32s} {:>9d} points {:10.4f} s {:10.1f} MB".format(
+                case, count, seconds, peak / 1e6))
+    return records
+
+
+def Compare(old_path, new_path):
+    """Prints the time ratio new/old of the cases found in both runs"""
+    with open(old_path) as file:
+        old = {(r['case'], r['points']): r for r in json.load(file)['results']}
+    with open(new_path) as file:
+        new = {(r['case'], r['points']): r for r in json.load(file)['results']}
+    for key in sorted(set(old) & set(new)):
+        ratio = new[key]['seconds'] / old[key]['seconds']
+        print("{:32s} {:>9d} points  x{:.2f}{}".format(
+            key[0], key[1], ratio, "  SLOWER" if ratio > 1.2 else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--max-points', type=int, default=100000,
+                        help='largest case to run (up to 10000000)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timed repetitions per case, best is kept')
+    parser.add_argument('-o', '--output', help='JSON file for the results')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two result files instead of running')
+    args = parser.parse_args(argv)
+    if args.compare:
+        Compare(*args.compare)
+        return
+    results = Run_cases(args.max_points, args.repeat)
+    report = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'python': platform.python_version(),
+              'numpy': np.__version__,
+              'machine': platform.machine(),
+              'cpu_count': os.cpu_count(),
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
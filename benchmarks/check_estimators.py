@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 09:14:52 2026
+
+Consistency checks of the Helmert estimators on Testing_data.txt.
+
+The shortcuts of the package (rank-3 downdates, incremental updates, ...)
+are compared with full solves of the same problems on the repository's
+own ECEF test data, where an ill-conditioned normal matrix shows up as
+centimetre errors. Exits with status 1 when a deviation exceeds its
+tolerance, so it can gate changes:
+
+    python benchmarks/check_estimators.py
+"""
+
+import argparse
+import ast
+import os
+import re
+import sys
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from Helmert_new.Helmert3Dtransform import (  # noqa: E402
+    Forward_model, Helmert_transform, HelmertKey, MAX_ITERATIONS,
+    Rotation_angles, Rotation_matrix)
+from Helmert_new.batch import Helmert_transform_batch  # noqa: E402
+from Helmert_new.diagnostics import Leave_one_out  # noqa: E402
+from Helmert_new.incremental import HelmertEstimator  # noqa: E402
+from Helmert_new.models import (  # noqa: E402
+    Estimate_transformation, Get_model)
+from Helmert_new.streaming import Helmert_transform_streaming  # noqa: E402
+
+
+def Testing_data():
+    """(From, To) point dictionaries of Testing_data.txt"""
+    with open(os.path.join(ROOT, 'Testing_data.txt'), 'r') as file:
+        text = file.read()
+    return tuple(ast.literal_eval(re.search(name + r' = (\{.*?\})', text,
+                                            re.S).group(1))
+                 for name in ('From', 'To'))
+
+
+def Check_ragged_batch(From, To):
+    """Largest difference [m] of the transformed points between ragged
+    batches (leading subsets of 3, 4, ... identical points) and single
+    solves of the same subsets, for the 3D models; inf when a fit of a
+    batch reports no convergence"""
+    names = sorted(To)
+    subsets = [names[:size] for size in range(3, len(names) + 1)]
+    points = np.array([From[name] for name in names])
+    deviation = 0.0
+    for model in ('helmert7', 'rigid6', 'helmert9'):
+        model = Get_model(model)
+        x, converged = Helmert_transform_batch(
+            [np.array([From[name] for name in subset]) for subset in subsets],
+            [np.array([To[name] for name in subset]) for subset in subsets],
+            model=model)
+        if not converged.all():
+            return np.inf
+        for x_batch, subset in zip(x, subsets):
+            x_single = Estimate_transformation(
+                From, {name: To[name] for name in subset}, model)
+            deviation = max(deviation, np.abs(
+                model.forward(x_batch, points) -
+                model.forward(x_single, points)).max())
+    return deviation
+
+
+def Check_streaming(From, To):
+    """Largest difference [m] of the transformed points between
+    Helmert_transform_streaming over chunks of a single point and
+    Helmert_transform, inf when the streaming solve does not converge"""
+    names = sorted(To)
+    points = np.array([From[name] for name in names])
+    x, stats = Helmert_transform_streaming(
+        (points, np.array([To[name] for name in names])), chunk_size=1,
+        return_stats=True)
+    if stats['status'] == MAX_ITERATIONS:
+        return np.inf
+    return np.abs(Forward_model(x, points) -
+                  Forward_model(Helmert_transform(From, To), points)).max()
+
+
+def Check_leave_one_out(From, To):
+    """Largest difference [m] between the prediction errors of the rank-3
+    downdates and of the exact leave-one-out solves"""
+    downdated = Leave_one_out(From, To)
+    exact = Leave_one_out(From, To, exact=True, workers=1)
+    return np.abs(downdated['prediction_error'] -
+                  exact['prediction_error']).max()
+
+
+def Check_incremental(From, To):
+    """Largest difference [m] of the residuals and of the transformed
+    points between HelmertEstimator after re-measuring one point and
+    removing another, and a full Helmert_transform of the edited points"""
+    names = sorted(To)
+    remeasured = tuple(np.array(To[names[2]]) + (0.003, -0.002, 0.001))
+    estimator = HelmertEstimator(From, To)
+    estimator.update_point(names[2], To_xyz=remeasured)
+    estimator.remove_point(names[0])
+    edited = dict(To, **{names[2]: remeasured})
+    del edited[names[0]]
+    x, stats = Helmert_transform(From, edited, return_stats=True)
+    residuals = estimator.residuals()
+    residual_deviation = max(
+        np.abs(residuals[name] - row).max()
+        for name, row in zip(stats['identicals'], stats['residuals']))
+    points = np.array([From[name] for name in names])
+    point_deviation = np.abs(Forward_model(estimator.parameters(), points) -
+                             Forward_model(x, points)).max()
+    return max(residual_deviation, point_deviation)
+
+
+def Check_levenberg_marquardt(From, To):
+    """Largest difference [m] of the transformed points between the
+    Levenberg-Marquardt and the Gauss-Newton solver on 50 noisy copies of
+    the test data (2 mm), inf when a Levenberg-Marquardt solve stops
+    without converging"""
+    rng = np.random.default_rng(0)
+    names = sorted(To)
+    points = np.array([From[name] for name in names])
+    deviation = 0.0
+    for _ in range(50):
+        noisy = {name: tuple(np.array(To[name]) +
+                             rng.normal(scale=0.002, size=3))
+                 for name in names}
+        x, stats = Helmert_transform(From, noisy, return_stats=True,
+                                     solver="levenberg_marquardt")
+        if stats['status'] == MAX_ITERATIONS:
+            return np.inf
+        deviation = max(deviation, np.abs(
+            Forward_model(x, points) -
+            Forward_model(Helmert_transform(From, noisy), points)).max())
+    return deviation
+
+
+def Check_composed_keys(From, To):
+    """Largest difference [m] between the test data transformed into ECEF
+    by a composed HelmertKey and by its two Keys one after the other, the
+    composed rotation being close to the beta = pi/2 singularity of the
+    angles"""
+    points = np.array([From[name] for name in sorted(To)])
+    second = HelmertKey(Helmert_transform(From, To))
+    R = second.R.T @ Rotation_matrix((0.3, np.pi / 2 - 1e-7, 0.1))
+    first = HelmertKey((10.0, 20.0, 30.0, 1.0) + tuple(
+        float(angle) for angle in Rotation_angles(R)))
+    return np.abs(first.then(second).apply(points) -
+                  second.apply(first.apply(points))).max()
+
+
+# (name, check, tolerance [m])
+CHECKS = (
+    ('ragged batch vs single solves', Check_ragged_batch, 0.00001),
+    ('streaming by single points vs full solve', Check_streaming, 0.00001),
+    ('leave-one-out downdate vs exact', Check_leave_one_out, 0.00001),
+    ('incremental updates vs full solve', Check_incremental, 0.00001),
+    ('levenberg-marquardt vs gauss-newton', Check_levenberg_marquardt,
+     0.00001),
+    ('composed keys vs keys in sequence', Check_composed_keys, 0.00001),
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.parse_args(argv)
+    From, To = Testing_data()
+    failed = False
+    for name, check, tolerance in CHECKS:
+        deviation = check(From, To)
+        failed |= not deviation <= tolerance
+        print("{:40s} {:10.2e} m / {:8.1e} m  {}".format(
+            name, deviation, tolerance,
+            "ok" if deviation <= tolerance else "FAILED"))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 11:47:03 2026
+
+Import-time budget of the Helmert_new package.
+
+Every statement is run in a fresh interpreter with -X importtime. The
+time spent in the package's own modules (numpy excluded) has to stay
+within its budget, and the listed heavy modules must not be imported.
+Exits with status 1 when a budget is exceeded, so it can gate changes:
+
+    python benchmarks/check_import_time.py
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PACKAGE = 'Helmert_new'
+HEAVY = ('pandas', 'matplotlib', 'scipy')
+# (statement, budget of the package's own modules [ms], forbidden modules)
+BUDGETS = (
+    ('import Helmert_new', 10, HEAVY + ('numpy',)),
+    ('import Helmert_new as hn; hn.Transformation', 30, HEAVY),
+    ('import Helmert_new as hn; hn.Helmert_transform', 30, HEAVY),
+    ('import Helmert_new as hn; hn.Helmert_transform_batch', 40, HEAVY),
+)
+
+
+def Import_times(statement):
+    """{module: (self, cumulative)} import times [ms] of statement run in
+    a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             statement], cwd=ROOT, capture_output=True,
+                            text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return times
+
+
+def Check(repeat=5):
+    """Checks all budgets, the best of repeat runs counts.
+    Returns a list of (statement, milliseconds, budget, problems)"""
+    report = []
+    for statement, budget, forbidden in BUDGETS:
+        best = None
+        for _ in range(repeat):
+            times = Import_times(statement)
+            own = sum(self_ms for name, (self_ms, _) in times.items()
+                      if name.split('.')[0] == PACKAGE)
+            best = own if best is None else min(best, own)
+        loaded = {name.split('.')[0] for name in times}
+        problems = ["imports {}".format(name) for name in forbidden
+                    if name in loaded]
+        if best > budget:
+            problems.append("over budget")
+        report.append((statement, best, budget, problems))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per statement, best is kept')
+    args = parser.parse_args(argv)
+    failed = False
+    for statement, milliseconds, budget, problems in Check(args.repeat):
+        failed |= bool(problems)
+        print("{:56s} {:6.1f} ms / {:3d} ms  {}".format(
+            statement, milliseconds, budget,
+            ", ".join(problems) if problems else "ok"))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())